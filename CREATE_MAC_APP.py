@@ -1,6 +1,7 @@
 import os
-import stat
+import sys
 import shutil
+import threading
 from pathlib import Path
 
 # Setup paths
@@ -8,34 +9,10 @@ src_dir = Path("/Users/shivam.kole/Downloads/Transcriptor SK")
 app_name = "AI Transcriptor.app"
 app_dir = Path("/Applications") / app_name
 desktop_app_dir = Path("/Users/shivam.kole/Desktop") / app_name
+python_bin = sys.executable
 
-# Refresh if exists
-if app_dir.exists():
-    shutil.rmtree(app_dir)
-if desktop_app_dir.exists():
-    shutil.rmtree(desktop_app_dir)
-
-# Create layout
-app_dir.mkdir(parents=True, exist_ok=True)
-macos_dir = app_dir / "Contents" / "MacOS"
-res_dir = app_dir / "Contents" / "Resources"
-macos_dir.mkdir(parents=True, exist_ok=True)
-res_dir.mkdir(parents=True, exist_ok=True)
-
-# Generate and copy icon
-try:
-    from PIL import Image
-    logo_path = src_dir / "static" / "logo.png"
-    icns_path = res_dir / "icon.icns"
-    if logo_path.exists():
-        img = Image.open(logo_path)
-        img.save(icns_path, format="ICNS")
-except ImportError:
-    print("⚠️ PIL not installed, skipping Mac icon generation. Run 'pip install Pillow' to get the icon.")
-
-# Write Info.plist
-info_plist = app_dir / "Contents" / "Info.plist"
-info_plist.write_text('''<?xml version="1.0" encoding="UTF-8"?>
+# Bundle file contents, encoded once up front
+INFO_PLIST_BYTES = b'''<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
 <dict>
@@ -50,19 +27,14 @@ info_plist.write_text('''<?xml version="1.0" encoding="UTF-8"?>
     <key>NSHighResolutionCapable</key>
     <true/>
 </dict>
-</plist>''')
+</plist>'''
 
-# Write run script (background runner snippet)
-import sys
-python_bin = sys.executable
-
-run_script = macos_dir / "run"
-run_script_sh = f'''#!/bin/bash
+RUN_SCRIPT_TEMPLATE = '''#!/bin/bash
 DIR="{src_dir}"
 cd "$DIR"
 
-# Check if application is already running on port 8765
-if lsof -Pi :8765 -sTCP:LISTEN -t >/dev/null ; then
+# Check if application is already running on port 8765 (plain TCP probe, no lsof fd-table scan)
+if (exec 3<>/dev/tcp/127.0.0.1/8765) 2>/dev/null ; then
     # It's already running, just open the browser
     open "http://127.0.0.1:8765"
 else
@@ -70,13 +42,74 @@ else
     "{python_bin}" main.py
 fi
 '''
-run_script.write_text(run_script_sh)
+RUN_SCRIPT_BYTES = RUN_SCRIPT_TEMPLATE.format(src_dir=src_dir, python_bin=python_bin).encode("utf-8")
 
-# Make executable
-os.chmod(run_script, run_script.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+def swap_in(new_dir, target):
+    """Replace target with new_dir by two renames, deleting the displaced bundle off the critical path.
+
+    target is briefly absent between the renames; if the second one fails, the old bundle is put back.
+    """
+    old_dir = target.with_suffix(".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if target.exists():
+        os.replace(target, old_dir)
+    try:
+        os.replace(new_dir, target)
+    except OSError:
+        if old_dir.exists():
+            os.replace(old_dir, target)
+        raise
+    threading.Thread(target=shutil.rmtree, args=(old_dir,), kwargs={"ignore_errors": True}).start()
+
+# Build the fresh bundle next to the installed one, then swap it in
+build_dir = app_dir.with_suffix(".new")
+shutil.rmtree(build_dir, ignore_errors=True)
+
+# Create layout (makedirs creates build_dir/Contents on the way)
+macos_dir = build_dir / "Contents" / "MacOS"
+res_dir = build_dir / "Contents" / "Resources"
+os.makedirs(macos_dir, exist_ok=True)
+os.makedirs(res_dir, exist_ok=True)
+
+# Generate and copy icon
+try:
+    from PIL import Image
+    logo_path = src_dir / "static" / "logo.png"
+    icns_path = res_dir / "icon.icns"
+    # The bundle is rebuilt from scratch, so keep the rendered icon set outside it
+    icns_cache = Path.home() / "Library" / "Caches" / "AITranscriptor" / "icon.icns"
+    if logo_path.exists():
+        if not icns_cache.exists() or icns_cache.stat().st_mtime < logo_path.stat().st_mtime:
+            icns_cache.parent.mkdir(parents=True, exist_ok=True)
+            # Decode once and release the file handle before building the icon set
+            with Image.open(logo_path) as img:
+                img.load()
+                img.thumbnail((1024, 1024), Image.LANCZOS)
+                icon_set = [img.resize((s, s), Image.LANCZOS) for s in (16, 32, 64, 128, 256, 512, 1024)]
+            icon_set[-1].save(icns_cache, format="ICNS", append_images=icon_set[:-1])
+        shutil.copy2(icns_cache, icns_path)
+except ImportError:
+    print("⚠️ PIL not installed, skipping Mac icon generation. Run 'pip install Pillow' to get the icon.")
+
+# Write Info.plist
+info_plist = build_dir / "Contents" / "Info.plist"
+info_plist.write_bytes(INFO_PLIST_BYTES)
+
+# Write run script (background runner snippet) and make it executable through the same fd
+run_script = macos_dir / "run"
+fd = os.open(run_script, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+try:
+    os.write(fd, RUN_SCRIPT_BYTES)
+    os.fchmod(fd, 0o755)  # The umask may have masked the create mode
+finally:
+    os.close(fd)
 
+swap_in(build_dir, app_dir)
 print(f"✅ Mac App created successfully at: {app_dir}")
 
 # Mirror to Desktop for the easiest access
-shutil.copytree(app_dir, desktop_app_dir, dirs_exist_ok=True)
+desktop_build_dir = desktop_app_dir.with_suffix(".new")
+shutil.rmtree(desktop_build_dir, ignore_errors=True)
+shutil.copytree(app_dir, desktop_build_dir)
+swap_in(desktop_build_dir, desktop_app_dir)
 print(f"🚀 Shortcut placed on your Desktop as well: {desktop_app_dir}")
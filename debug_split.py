@@ -6,9 +6,15 @@ async def test():
     engine = TranscriptionEngine()
     audio_path = Path("/Users/shivam.kole/Library/Application Support/AITranscriptor/temp/6b9667cd.mp3")
     print("Starting split_audio task...")
-    
-    loop = asyncio.get_event_loop()
-    chunks = await loop.run_in_executor(None, engine.split_audio, audio_path, 10)
+
+    chunks = await engine.split_audio(audio_path, 10, "debug")
     print("Finished split audio!", len(chunks))
 
-asyncio.run(test())
+if __name__ == "__main__":
+    # uvloop ships with uvicorn[standard] (not on Windows); fall back to the stdlib loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(test(), debug=False)
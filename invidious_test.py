@@ -20,4 +20,10 @@ async def test_download():
     print("Download result:", result)
 
 if __name__ == "__main__":
-    asyncio.run(test_download())
+    # uvloop ships with uvicorn[standard] (not on Windows); fall back to the stdlib loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(test_download(), debug=False)
@@ -1,30 +1,130 @@
 import os
 import sys
 import time
+import uuid
+import shutil
+import threading
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Auto-Install Dependencies ---
+DEPS_SENTINEL = Path(__file__).with_suffix('.deps_ok')
+
 def ensure_dependencies():
+    # Warm start: a previous run already verified/installed everything
+    if DEPS_SENTINEL.exists():
+        return
     try:
         import yt_dlp
         import requests
     except ImportError:
         print("📦 Installing required packages (yt-dlp, requests)...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "yt-dlp", "requests", "--quiet"])
+        subprocess.check_call(
+            [sys.executable, "-m", "pip", "install", "yt-dlp", "requests", "--quiet",
+             "--disable-pip-version-check", "--no-input"],
+            close_fds=False, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL
+        )
         print("✅ Packages installed successfully!\n")
+    try:
+        DEPS_SENTINEL.touch()
+    except OSError:
+        pass
 
 ensure_dependencies()
 
 import yt_dlp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Configuration ---
 HF_SPACE_URL = "https://shivamkole1969-transcriptai-sk.hf.space"
 UPLOAD_URL = f"{HF_SPACE_URL}/api/transcribe/upload"
+UPLOAD_CHUNK_SIZE = 256 * 1024  # Stream the recording to the socket in 256 KiB blocks
+MAX_ERROR_BODY = 64 * 1024  # Only echo the head of an error page
+TAIL_POLL_SECONDS = 0.05
+# Windows refuses to rename a file another handle has open, so yt-dlp's final
+# .part -> .m4a rename would fail while we tail it. Upload after download there.
+PIPELINE_UPLOAD = os.name != 'nt'
+# aria2c (when installed) fetches with 8 parallel connections, but writes the
+# file out of order, so its downloads can't be tailed either.
+ARIA2C_PATH = shutil.which('aria2c')
+
+# Shared connection pool; Retry's default allowed_methods exclude POST, so only
+# connect failures are retried and the streamed upload body is never replayed.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+))
 
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
+    if os.name == 'nt':
+        # Legacy Windows consoles don't interpret ANSI escapes
+        os.system('cls')
+        return
+    # Clear + home the cursor directly rather than forking a shell for `clear`
+    sys.stdout.write('\x1b[2J\x1b[H')
+    sys.stdout.flush()
+
+def follow_download(filename, download):
+    """Yield the bytes of a file yt-dlp is still writing until the download future completes."""
+    while True:
+        # yt-dlp writes to '<name>.part' and renames it once finished
+        for path in (filename + '.part', filename):
+            try:
+                f = open(path, 'rb', buffering=UPLOAD_CHUNK_SIZE)
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            if download.done():
+                download.result()  # Surface the download error, if any
+                raise FileNotFoundError(filename)
+            time.sleep(TAIL_POLL_SECONDS)
+            continue
+        break
+
+    sent = 0
+    with f:
+        while True:
+            finished = download.done()
+            # A chunk yt-dlp couldn't resume restarts the .part from byte 0; what we sent no longer matches it
+            if os.fstat(f.fileno()).st_size < sent:
+                raise RuntimeError("download restarted from the beginning mid-upload; aborting to avoid a corrupt file")
+            block = f.read(UPLOAD_CHUNK_SIZE)
+            if block:
+                sent += len(block)
+                yield block
+            elif finished:
+                download.result()  # Abort the upload if yt-dlp failed midway
+                return
+            else:
+                time.sleep(TAIL_POLL_SECONDS)
+
+def remove_download(filename):
+    for path in (filename, filename + '.part'):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+def multipart_stream(fields, file_field, filename, content_type, chunks, boundary):
+    """Frame form fields and a streamed file as a multipart/form-data body."""
+    for name, value in fields.items():
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f'{value}\r\n'
+        ).encode('utf-8')
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode('utf-8')
+    yield from chunks
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
 
 def main():
     clear_screen()
@@ -34,61 +134,72 @@ def main():
     print("\nThis tool bypasses YouTube Cloud Datacenter Blocks by downloading")
     print("the audio on your local computer, then seamlessly uploading it")
     print("to your Cloud Dashboard for AI Transcription.\n")
-    
+
     url = input("🔗 Enter YouTube / Video URL: ").strip()
     if not url:
         return
-        
+
     company = input("🏢 Enter Meeting/Company Name (Optional): ").strip()
     if not company:
         company = "Meeting"
-        
+
     print("\n📥 Step 1: Downloading audio locally (bypassing blocks)...")
-    
+
     # Secure a temp filename
     temp_file = "local_agent_temp_audio"
-    
+
     # Keep it simple, let yt-dlp grab the best audio, no ffmpeg required locally if we don't convert
     ydl_opts = {
         'format': 'm4a/bestaudio/best',
         'outtmpl': temp_file + '.%(ext)s',
         'quiet': False,
         'no_warnings': True,
+        # Fewer, larger range requests and parallel fragments for DASH/HLS audio
+        'http_chunk_size': 10 * 1024 * 1024,
+        'concurrent_fragment_downloads': 4,
+        'buffersize': 1024 * 1024,
     }
-    
+    # Raising from a progress hook is how yt-dlp lets us stop a download early
+    abort_download = threading.Event()
+
+    def check_abort(status):
+        if abort_download.is_set():
+            raise yt_dlp.utils.DownloadCancelled()
+
+    ydl_opts['progress_hooks'] = [check_abort]
+    if ARIA2C_PATH:
+        ydl_opts.update({
+            'external_downloader': {'default': ARIA2C_PATH},
+            'external_downloader_args': {'aria2c': ['-x', '8', '-k', '1M']},
+        })
+
     downloaded_file = None
+    download = None
+    executor = ThreadPoolExecutor(max_workers=1)
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            ext = info.get('ext', 'm4a')
-            downloaded_file = f"{temp_file}.{ext}"
-    except Exception as e:
-        print(f"\n❌ Error downloading: {e}")
-        input("Press Enter to exit...")
-        return
-        
-    if not os.path.exists(downloaded_file):
-        # Fallback if FFmpeg isn't installed locally (yt-dlp downloads m4a/webm)
-        for f in os.listdir("."):
-            if f.startswith(temp_file):
-                downloaded_file = f
-                break
-                
-    if not os.path.exists(downloaded_file):
-        print("\n❌ Could not find downloaded file. Do you have FFmpeg installed?")
-        input("Press Enter to exit...")
-        return
-        
-    print(f"\n✅ Download complete. Selected file: {downloaded_file}")
-    print(f"☁️  Step 2: Uploading to {HF_SPACE_URL} ...")
-    
-    try:
-        with open(downloaded_file, 'rb') as f:
-            files = {'file': (downloaded_file, f, 'audio/mpeg')}
-            data = {'company_name': company}
-            
-            response = requests.post(UPLOAD_URL, files=files, data=data)
-            
+            # Resolve the format first so the upload knows which file to follow
+            info = ydl.extract_info(url, download=False)
+            downloaded_file = ydl.prepare_filename(info)
+
+            # Download in the background while the upload streams the bytes already on disk
+            download = executor.submit(ydl.process_ie_result, info, download=True)
+            if not PIPELINE_UPLOAD or ARIA2C_PATH:
+                download.result()
+
+            print(f"\n☁️  Step 2: Uploading {downloaded_file} to {HF_SPACE_URL} ...")
+
+            boundary = uuid.uuid4().hex
+            body = multipart_stream(
+                {'company_name': company}, 'file', os.path.basename(downloaded_file), 'audio/mpeg',
+                follow_download(downloaded_file, download), boundary
+            )
+            headers = {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+            response = SESSION.post(UPLOAD_URL, data=body, headers=headers, stream=True)
+
+        print(f"\n✅ Download & upload complete. Selected file: {downloaded_file}")
+
         if response.status_code == 200:
             job_info = response.json()
             job_id = job_info.get("job_id", "")
@@ -100,19 +211,33 @@ def main():
             print("=" * 60 + "\n")
         else:
             print(f"\n❌ Server rejected the upload. Status Code: {response.status_code}")
-            print(response.text)
-            
+            # Stream the error body so a huge proxy error page is never fully materialized
+            error_body = b''
+            for block in response.iter_content(chunk_size=UPLOAD_CHUNK_SIZE):
+                error_body += block
+                if len(error_body) >= MAX_ERROR_BODY:
+                    break
+            print(error_body[:MAX_ERROR_BODY].decode('utf-8', 'replace'))
+        response.close()
+
     except Exception as e:
-        print(f"\n❌ Error uploading: {e}")
-        
+        # A failed download aborts the in-flight upload, so report whichever stage actually broke
+        if download is None or (download.done() and download.exception()):
+            print(f"\n❌ Error downloading: {download.exception() if download else e}")
+        else:
+            print(f"\n❌ Error uploading: {e}")
+
     finally:
-        # Cleanup
-        try:
-            if os.path.exists(downloaded_file):
-                os.remove(downloaded_file)
-        except:
-            pass
-            
+        # Don't hold the error report (or Ctrl-C) until a download we no longer need has finished
+        abort_download.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Cleanup, once yt-dlp has stopped writing the file
+        if downloaded_file:
+            if download is None or download.done():
+                remove_download(downloaded_file)
+            else:
+                download.add_done_callback(lambda _: remove_download(downloaded_file))
+
     input("Press Enter to exit...")
 
 if __name__ == "__main__":
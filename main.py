@@ -12,27 +12,62 @@ import json
 import re
 import time
 import uuid
+import random
 import asyncio
 import logging
 import platform
 import shutil
 import threading
+import zipfile
+import hashlib
+import functools
+from contextlib import asynccontextmanager
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Optional, List, Dict
-from concurrent.futures import ThreadPoolExecutor
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeout
+from array import array
+from collections import deque
 
+import httpx
 import uvicorn
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form, HTTPException
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None
+
+try:
+    from pytubefix import YouTube
+    HAS_PYTUBEFIX = True
+except ImportError:
+    YouTube = None
+    HAS_PYTUBEFIX = False
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, UploadFile, File, Form, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
 
 # ─── Path Resolution ─────────────────────────────────────────────────────────
+_ensured_dirs = set()
+
+def ensure_dir(path: Path) -> Path:
+    """mkdir -p once per process; repeat calls for the same path skip the filesystem entirely."""
+    key = str(path)
+    if key not in _ensured_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(key)
+    return path
+
 def get_base_path():
     """Get the base path for the application, works for both dev and PyInstaller."""
     if getattr(sys, 'frozen', False):
@@ -44,8 +79,8 @@ STATIC_DIR = BASE_DIR / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
 
 # Ensure directories exist
-for d in [STATIC_DIR, TEMPLATES_DIR, STATIC_DIR / "css", STATIC_DIR / "js", STATIC_DIR / "img"]:
-    d.mkdir(parents=True, exist_ok=True)
+for d in [TEMPLATES_DIR, STATIC_DIR / "css", STATIC_DIR / "js", STATIC_DIR / "img"]:
+    ensure_dir(d)
 
 # ─── Corporate Security / SSL ────────────────────────────────────────────────
 cert_path = BASE_DIR / "custom_bundle.pem"
@@ -53,6 +88,8 @@ if cert_path.exists():
     os.environ['REQUESTS_CA_BUNDLE'] = str(cert_path)
     os.environ['CURL_CA_BUNDLE'] = str(cert_path)
     os.environ['SSL_CERT_FILE'] = str(cert_path)
+# Resolved once: httpx clients take the bundle path, or the default trust store when it's absent
+SSL_VERIFY = str(cert_path) if cert_path.exists() else True
 os.environ['NO_PROXY'] = 'localhost,127.0.0.1'
 
 # ─── FFmpeg Setup ─────────────────────────────────────────────────────────────
@@ -81,6 +118,33 @@ def setup_ffmpeg():
     return None
 
 FFMPEG_PATH = setup_ffmpeg()
+# Common argv prefix: never read the console, keep stderr quiet, let ffmpeg pick its thread count
+FFMPEG_BASE = [FFMPEG_PATH or "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0"]
+
+def find_ffprobe():
+    """Locate ffprobe next to the resolved ffmpeg, fallback to system PATH."""
+    if FFMPEG_PATH:
+        sibling = Path(FFMPEG_PATH).with_name("ffprobe.exe" if platform.system() == "Windows" else "ffprobe")
+        if sibling.exists():
+            return str(sibling)
+    return shutil.which("ffprobe")
+
+FFPROBE_PATH = find_ffprobe()
+
+# Groq rejects uploads above 25 MB; keep stream-copied chunks safely below it
+GROQ_MAX_CHUNK_BYTES = 24 * 1024 * 1024
+
+# Containers Groq Whisper accepts as-is: proxy streams in these skip the MP3 transcode
+PROXY_PASSTHROUGH_EXTS = {"audio/webm": ".webm", "audio/mp4": ".m4a", "audio/mpeg": ".mp3"}
+# Codecs split_audio can cut with -c copy, and the segment container each one goes into
+STREAM_COPY_EXTS = {"mp3": ".mp3", "opus": ".webm", "aac": ".m4a"}
+CHUNK_MIME_TYPES = {".mp3": "audio/mpeg", ".webm": "audio/webm", ".m4a": "audio/mp4"}
+
+# Proxy audio is already compressed; identity keeps bytes untouched on their way to ffmpeg
+PROXY_AUDIO_HEADERS = {"Accept-Encoding": "identity"}
+PROXY_MIN_AUDIO_BYTES = 50000
+# Uploads and proxy downloads are copied to disk in blocks this size, never held whole in memory
+UPLOAD_COPY_CHUNK = 1 << 20
 
 # ─── User Data (Isolated per user) ───────────────────────────────────────────
 def get_app_data_dir():
@@ -93,13 +157,21 @@ def get_app_data_dir():
     else:
         base = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
     app_dir = Path(base) / "AITranscriptor"
-    app_dir.mkdir(parents=True, exist_ok=True)
-    return app_dir
+    return ensure_dir(app_dir)
 
 APP_DATA_DIR = get_app_data_dir()
 SETTINGS_FILE = APP_DATA_DIR / "api_settings.json"
-HISTORY_FILE = APP_DATA_DIR / "history.json"
-SCHEDULE_FILE = APP_DATA_DIR / "schedules.json"
+HISTORY_FILE = APP_DATA_DIR / "history.jsonl"
+SCHEDULE_FILE = APP_DATA_DIR / "schedules.jsonl"
+# Pre-JSONL single-document stores, migrated on first load
+LEGACY_HISTORY_FILE = APP_DATA_DIR / "history.json"
+LEGACY_SCHEDULE_FILE = APP_DATA_DIR / "schedules.json"
+HISTORY_LIMIT = 500
+KEYWORD_CACHE_FILE = APP_DATA_DIR / "company_keywords.json"
+KEYWORD_CACHE_TTL = 30 * 86400  # Company rosters/jargon barely change month to month
+# Speaker-change lists keyed by a hash of the exact prompts, so re-running a recording skips the LLM
+DIARIZATION_CACHE_DIR = APP_DATA_DIR / "diarization_cache"
+DIARIZATION_CACHE_TTL = 30 * 86400
 
 # Put downloads in the user's actual Downloads folder for easy access
 DOWNLOADS_BASE = Path(os.path.expanduser('~')) / "Downloads"
@@ -108,8 +180,37 @@ OUTPUT_DIR = DOWNLOADS_BASE / "AITranscriptor"
 MP3_DIR = APP_DATA_DIR / "Mp3"
 TEMP_DIR = APP_DATA_DIR / "temp"
 
-for d in [OUTPUT_DIR, MP3_DIR, TEMP_DIR]:
-    d.mkdir(parents=True, exist_ok=True)
+for d in [OUTPUT_DIR, MP3_DIR, TEMP_DIR, DIARIZATION_CACHE_DIR]:
+    ensure_dir(d)
+
+# Fallback YouTube cookies for yt-dlp, written once and shared by every job
+DEFAULT_YT_COOKIES = """# Netscape HTTP Cookie File
+# https://curl.haxx.se/rfc/cookie_spec.html
+# This is a generated file! Do not edit.
+
+.youtube.com	TRUE	/	FALSE	1804679192	HSID	A-aXQAS_DUtkVJ6gY
+.youtube.com	TRUE	/	TRUE	1804679192	SSID	AMvny_LXbARGeUgwH
+.youtube.com	TRUE	/	FALSE	1804679192	APISID	h_6o4Tb7GEuX4R-f/AisuzVJPDyknakWBB
+.youtube.com	TRUE	/	TRUE	1804679192	SAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
+.youtube.com	TRUE	/	TRUE	1804679192	__Secure-1PAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
+.youtube.com	TRUE	/	TRUE	1804679192	__Secure-3PAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
+.youtube.com	TRUE	/	FALSE	1804679192	SID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYsBapfAEW_lgehWjM24DU2bwACgYKAf8SARQSFQHGX2MiYChuxYvp5LTwSJJoYNz2JBoVAUF8yKp_D5fn1Yxp4RtTsDdQR3XW0076
+.youtube.com	TRUE	/	TRUE	1804679192	__Secure-1PSID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYsZY6YS95RausKFbsFsFIy3AACgYKAdwSARQSFQHGX2MirqHn6Fm4bsubz7IZc_9bsRoVAUF8yKq59r0lH1n8bO_bdeNwn-wH0076
+.youtube.com	TRUE	/	TRUE	1804679192	__Secure-3PSID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYs1IF4rZ9zD2SEgNkeyHtHagACgYKAbwSARQSFQHGX2MiDMWQSKzBgB5YbzL4V1bsihoVAUF8yKo9AtX51J-R_xNfY9AWHsgY0076
+.youtube.com	TRUE	/	TRUE	1804679192	LOGIN_INFO	AFmmF2swRQIgcgZgE70aAwlul_3Xq4Cb7FgHo6oumqnzvQbHiWnOBmYCIQDRK8pWscfqTu8Jn-YzlT5YfCOHwzx2Vziw3_jub1zpRg:QUQ3MjNmdzYzdVFnMkIyZTk1cGo2akloZkduMGpJaU8xYUw4V0lPSkRIeFN5S3hFUDBLVkNUc29mQkhGNkhvVXZseHY1VHpfWlZHV3lISUQ2NzJkd1VrOHI5eVhhMFhXRHlkeWU2c2w2UC1iVGhYUzQxcXY5QkVEU01XTWxtVUlKTHdJVXh5SDdPQ1k5WHJBQ2owRXIyUE9SQkVfTTRCOWh3
+.youtube.com	TRUE	/	TRUE	1806587430	PREF	f6=40000080&tz=Asia.Calcutta&f4=4000000&f7=100
+.youtube.com	TRUE	/	TRUE	1803569087	__Secure-1PSIDTS	sidts-CjUBBj1CYoBzvFZKd8Ek_AMX8EDmxnIkwRiwZ7dS2i7fMSYHO_8OuUUsAx5NopFS3PZ2bgVjOhAA
+.youtube.com	TRUE	/	TRUE	1803569087	__Secure-3PSIDTS	sidts-CjUBBj1CYoBzvFZKd8Ek_AMX8EDmxnIkwRiwZ7dS2i7fMSYHO_8OuUUsAx5NopFS3PZ2bgVjOhAA
+.youtube.com	TRUE	/	FALSE	1803569087	SIDCC	AKEyXzWmOV09wFQDsxi0XObdzrHbE-OEgCQUHjrWvVsGYB6T46kFLTnPAw2CiSg-W3VbJrW9eQ
+.youtube.com	TRUE	/	TRUE	1803569087	__Secure-1PSIDCC	AKEyXzUExAURWNcxKZfRPcu5TK_S_LqiQUGNQOmVgZ-NGHEeJX-NWJgU4N5fZ5srCWQ6Bw_YMg
+.youtube.com	TRUE	/	TRUE	1803569087	__Secure-3PSIDCC	AKEyXzVSLqE3vYV-kxHR_khPJDslxXkwwEPNxpPO0aEATGFE1wrS6MCeAqyAPk_XGqhScKFX2HM
+.youtube.com	TRUE	/	TRUE	1787517472	VISITOR_INFO1_LIVE	uyBWueKyEQU
+.youtube.com	TRUE	/	TRUE	1787517472	VISITOR_PRIVACY_METADATA	CgJJThIEGgAgZw%3D%3D
+.youtube.com	TRUE	/	TRUE	0	YSC	LEHEe6DUbIM
+.youtube.com	TRUE	/	TRUE	1787573553	__Secure-ROLLOUT_TOKEN	CN3Zu8WDp-7mgAEQucTTx7mJkQMYvM3U2c70kgM%3D"""
+DEFAULT_YT_COOKIES_FILE = APP_DATA_DIR / "default_yt_cookies.txt"
+if not DEFAULT_YT_COOKIES_FILE.exists():
+    DEFAULT_YT_COOKIES_FILE.write_text(DEFAULT_YT_COOKIES)
 
 # ─── Logging ──────────────────────────────────────────────────────────────────
 LOG_FILE = APP_DATA_DIR / "app.log"
@@ -123,16 +224,116 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AITranscriptor")
 
+# ─── JSON Persistence Helpers ────────────────────────────────────────────────
+def dumps_json(data, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, default=str, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def encode_multipart(fields: dict, file_field: Optional[str] = None, filename: str = "", content_type: str = "", payload: bytes = b""):
+    """Frame form fields plus an optional file as a multipart/form-data body. Returns (body, Content-Type header)."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        for name, value in fields.items()
+    ]
+    if file_field:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+        )
+        parts.append(payload)
+        parts.append(b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+def loads_json(data):
+    """Parse JSON from bytes or str, using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # The stdlib is laxer (NaN/Infinity from LLM output); let it decide
+    return json.loads(data)
+
+def response_json(response):
+    """Parse an HTTP response body once (orjson when available); repeat calls reuse the result."""
+    if not hasattr(response, "_parsed_json"):
+        response._parsed_json = loads_json(response.content)
+    return response._parsed_json
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write to a sibling temp file and swap it in, so a crash never leaves a half-written file."""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+SAVE_DEBOUNCE_SECONDS = 0.25
+
+class DebouncedWriter:
+    """Coalesces bursts of save requests into one atomic file write on a background task."""
+    def __init__(self, path: Path, render):
+        self.path = path
+        self.render = render  # () -> bytes; runs on the event loop so it snapshots consistent state
+        self._dirty = asyncio.Event()
+        self._writing = False
+        self._closing = False
+        self._task = None
+
+    @property
+    def pending(self) -> bool:
+        """True while a rewrite is queued or in flight (appends made now would be clobbered)."""
+        return self._dirty.is_set() or self._writing
+
+    def request(self):
+        if self._task is None:
+            # No writer running (startup, scripts importing main): save inline
+            atomic_write_bytes(self.path, self.render())
+        else:
+            self._dirty.set()
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            if not self._closing:
+                await asyncio.sleep(SAVE_DEBOUNCE_SECONDS)
+            self._dirty.clear()
+            self._writing = True
+            try:
+                await asyncio.to_thread(atomic_write_bytes, self.path, self.render())
+            except Exception as e:
+                logger.error(f"Failed to save {self.path.name}: {e}")
+            finally:
+                self._writing = False
+            if self._closing:
+                return
+
+    def start(self):
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush once more and stop the writer task."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._dirty.set()
+        await self._task
+        self._task = None
+
 # ─── Settings Manager ────────────────────────────────────────────────────────
 class SettingsManager:
     def __init__(self):
         self.settings = self._load()
+        self._all_keys = self._collect_keys()
+        self._key_partition = self._partition_keys()
+        self.writer = DebouncedWriter(SETTINGS_FILE, lambda: dumps_json(self.settings, indent=True))
 
     def _load(self):
         if SETTINGS_FILE.exists():
             try:
-                with open(SETTINGS_FILE, 'r') as f:
-                    return json.load(f)
+                return loads_json(SETTINGS_FILE.read_bytes())
             except Exception:
                 pass
         return {
@@ -154,51 +355,146 @@ class SettingsManager:
         }
 
     def save(self):
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(self.settings, f, indent=2)
+        self.writer.request()
+
+    def _collect_keys(self):
+        return tuple(self.settings.get("paid_api_keys", [])) + tuple(self.settings.get("free_api_keys", []))
 
     def get_all_keys(self):
-        """Get all API keys, paid first then free."""
-        return self.settings.get("paid_api_keys", []) + self.settings.get("free_api_keys", [])
+        """Get all API keys, paid first then free (cached tuple, rebuilt only when settings change)."""
+        return self._all_keys
+
+    def _partition_keys(self):
+        """Split keys into (primary, backup) tuples, holding back ~25% of free keys as a reserve."""
+        paid_keys = self.settings.get("paid_api_keys", [])
+        free_keys = self.settings.get("free_api_keys", [])
+        
+        backup_count = 0
+        if free_keys:
+            backup_count = max(1, int(len(free_keys) * 0.25))
+            # If they only have 1 key, we can't reserve it as backup
+            if backup_count >= len(free_keys):
+                backup_count = 0 if len(free_keys) == 1 else 1
+
+        if backup_count > 0:
+            backup_keys = free_keys[-backup_count:]
+            primary_free = free_keys[:-backup_count]
+        else:
+            backup_keys = []
+            primary_free = free_keys
+            
+        return tuple(paid_keys + primary_free), tuple(backup_keys)
+
+    def get_key_partition(self):
+        """Get the cached (primary_keys, backup_keys) split, recomputed only when settings change."""
+        return self._key_partition
 
     def update(self, new_settings: dict):
         self.settings.update(new_settings)
+        self._all_keys = self._collect_keys()
+        self._key_partition = self._partition_keys()
         self.save()
 
 settings_manager = SettingsManager()
 
+# ─── JSONL Helpers ───────────────────────────────────────────────────────────
+def read_jsonl(path: Path) -> list:
+    """Read one JSON document per line, skipping a torn trailing line from an interrupted append."""
+    entries = []
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(loads_json(line))
+            except ValueError:
+                continue
+    return entries
+
+def render_jsonl(entries) -> bytes:
+    return b"".join(dumps_json(entry) + b"\n" for entry in entries)
+
+def write_jsonl(path: Path, entries):
+    atomic_write_bytes(path, render_jsonl(entries))
+
+def append_jsonl(path: Path, entry: dict):
+    with open(path, 'ab') as f:
+        f.write(dumps_json(entry) + b"\n")
+
+def migrate_legacy_json(legacy_path: Path, path: Path, newest_first: bool = False):
+    """Convert an old single-document JSON list into the JSONL log (oldest entry first)."""
+    if path.exists() or not legacy_path.exists():
+        return
+    try:
+        entries = loads_json(legacy_path.read_bytes())
+        write_jsonl(path, reversed(entries) if newest_first else entries)
+    except Exception:
+        pass
+
+_last_entry_ms = 0
+
+def new_entry_id() -> str:
+    """Short per-millisecond hex id; bumped past the previous one so same-ms inserts never collide."""
+    global _last_entry_ms
+    _last_entry_ms = max(int(time.time() * 1000), _last_entry_ms + 1)
+    return f"{_last_entry_ms:x}"[-8:]
+
+def with_display_time(entry: dict, key: str) -> dict:
+    """Copy of a stored entry with its epoch timestamp rendered as ISO text for the UI."""
+    ts = entry.get(key)
+    if not isinstance(ts, (int, float)):
+        return entry  # Entries written before epoch storage already hold ISO strings
+    return {**entry, key: datetime.fromtimestamp(ts).isoformat()}
+
 # ─── History Manager ─────────────────────────────────────────────────────────
 class HistoryManager:
+    """Newest-first history, persisted as an append-only JSONL log (oldest first) with periodic compaction."""
     def __init__(self):
+        self._file_lines = 0
         self.history = self._load()
+        self.writer = DebouncedWriter(HISTORY_FILE, lambda: render_jsonl(reversed(self.history)))
 
     def _load(self):
+        migrate_legacy_json(LEGACY_HISTORY_FILE, HISTORY_FILE, newest_first=True)
         if HISTORY_FILE.exists():
             try:
-                with open(HISTORY_FILE, 'r') as f:
-                    return json.load(f)
+                entries = read_jsonl(HISTORY_FILE)
+                self._file_lines = len(entries)
+                history = deque(reversed(entries[-HISTORY_LIMIT:]), maxlen=HISTORY_LIMIT)
+                if self._file_lines > HISTORY_LIMIT * 1.2:
+                    # Trim a log that outgrew the cap before the writer task exists
+                    write_jsonl(HISTORY_FILE, reversed(history))
+                    self._file_lines = len(history)
+                return history
             except Exception:
                 pass
-        return []
+        return deque(maxlen=HISTORY_LIMIT)
 
     def save(self):
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(self.history, f, indent=2, default=str)
+        """Compact the log down to the retained entries."""
+        self.writer.request()
+        self._file_lines = len(self.history)
 
     def add(self, entry: dict):
-        entry['timestamp'] = datetime.now().isoformat()
-        entry['id'] = str(uuid.uuid4())[:8]
-        self.history.insert(0, entry)
-        if len(self.history) > 500:
-            self.history = self.history[:500]
-        self.save()
+        # Stored as epoch seconds; formatted only when served
+        entry['timestamp'] = time.time()
+        entry['id'] = new_entry_id()
+        self.history.appendleft(entry)  # maxlen drops the oldest entry
+        # Append one line; only rewrite once trimmed entries pile up past the cap
+        # (or fold into a rewrite that is already queued, which would drop the appended line)
+        if self._file_lines + 1 > HISTORY_LIMIT * 1.2 or self.writer.pending:
+            self.save()
+        else:
+            append_jsonl(HISTORY_FILE, entry)
+            self._file_lines += 1
         return entry
 
     def get_all(self):
-        return self.history
+        return [with_display_time(e, 'timestamp') for e in self.history]
 
     def clear(self):
-        self.history = []
+        self.history.clear()
         self.save()
 
 history_manager = HistoryManager()
@@ -207,41 +503,54 @@ history_manager = HistoryManager()
 class ScheduleManager:
     def __init__(self):
         self.schedules = self._load()
+        self.writer = DebouncedWriter(SCHEDULE_FILE, lambda: render_jsonl(self.schedules))
 
     def _load(self):
+        migrate_legacy_json(LEGACY_SCHEDULE_FILE, SCHEDULE_FILE)
         if SCHEDULE_FILE.exists():
             try:
-                with open(SCHEDULE_FILE, 'r') as f:
-                    return json.load(f)
+                return read_jsonl(SCHEDULE_FILE)
             except Exception:
                 pass
         return []
 
     def save(self):
-        with open(SCHEDULE_FILE, 'w') as f:
-            json.dump(self.schedules, f, indent=2, default=str)
+        self.writer.request()
 
     def add(self, schedule: dict):
-        schedule['id'] = str(uuid.uuid4())[:8]
-        schedule['created'] = datetime.now().isoformat()
+        schedule['id'] = new_entry_id()
+        schedule['created'] = time.time()
         schedule['status'] = 'pending'
         self.schedules.append(schedule)
-        self.save()
-        return schedule
+        if self.writer.pending:
+            self.save()
+        else:
+            append_jsonl(SCHEDULE_FILE, schedule)
+        return with_display_time(schedule, 'created')
 
     def remove(self, schedule_id: str):
         self.schedules = [s for s in self.schedules if s.get('id') != schedule_id]
         self.save()
 
     def get_all(self):
-        return self.schedules
+        return [with_display_time(s, 'created') for s in self.schedules]
 
 schedule_manager = ScheduleManager()
 
 # ─── WebSocket Connection Manager ────────────────────────────────────────────
+# Per-chunk progress updates are coalesced and flushed at most this often (seconds)
+PROGRESS_COALESCE_SECONDS = 0.1
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Bounded buffer for best-effort log lines; drained by a single pump task
+        self.log_queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+        # Latest progress message per job, waiting for the coalescing timer
+        self._pending_progress: Dict[str, dict] = {}
+        self._progress_timer: Optional[asyncio.TimerHandle] = None
+        # Strong references to in-flight flush sends, so they aren't garbage-collected mid-send
+        self._flush_tasks: set = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -251,31 +560,461 @@ class ConnectionManager:
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
 
+    def publish(self, message: dict):
+        """Fire-and-forget a log message; dropped when the queue is full instead of blocking the producer."""
+        try:
+            self.log_queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def publish_progress(self, message: dict):
+        """Latest-wins progress update: a burst of chunk completions collapses into one send per job."""
+        self._pending_progress[message["job_id"]] = message
+        if self._progress_timer is None:
+            self._progress_timer = asyncio.get_running_loop().call_later(PROGRESS_COALESCE_SECONDS, self._flush_progress)
+
+    def _flush_progress(self):
+        self._progress_timer = None
+        pending, self._pending_progress = self._pending_progress, {}
+        for message in pending.values():
+            # Straight to _send: broadcast would pop an update published after this flush, and it would never go out
+            task = asyncio.create_task(self._send(message))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def pump(self):
+        """Drain published messages to the connected sockets."""
+        while True:
+            message = await self.log_queue.get()
+            await self.broadcast(message)
+
     async def broadcast(self, message: dict):
-        dead = []
-        for connection in self.active_connections:
-            try:
-                if connection.client_state == WebSocketState.CONNECTED:
-                    await connection.send_json(message)
-            except Exception:
-                dead.append(connection)
-        for d in dead:
-            self.disconnect(d)
+        if message.get("type") == "progress":
+            # A progress value sent now supersedes one still waiting to be coalesced
+            self._pending_progress.pop(message.get("job_id"), None)
+        await self._send(message)
+
+    async def _send(self, message: dict):
+        # Fan out concurrently so one slow or hung tab can't hold up everyone else's progress
+        targets = [c for c in self.active_connections if c.client_state == WebSocketState.CONNECTED]
+        # Serialize once for every socket rather than once per send_json
+        payload = dumps_json(message).decode('utf-8')
+        results = await asyncio.gather(
+            *(asyncio.wait_for(c.send_text(payload), timeout=2.0) for c in targets),
+            return_exceptions=True
+        )
+        for connection, result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection)
 
 ws_manager = ConnectionManager()
 
+# ─── Shared HTTP Clients ─────────────────────────────────────────────────────
+try:
+    import h2  # HTTP/2 is optional: httpx needs the h2 package for it
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+GROQ_API_BASE = "https://api.groq.com/openai/v1"
+# Process-wide cap on in-flight Groq requests, across every job and key
+GROQ_CONCURRENCY = int(os.environ.get("GROQ_CONCURRENCY", "16"))
+
+_proxy_client = None
+_groq_async_client = None
+_groq_client = None
+_groq_client_lock = threading.Lock()
+
+def get_proxy_client():
+    """Lazily create one pooled AsyncClient reused by every Invidious/Piped attempt."""
+    global _proxy_client
+    if _proxy_client is None:
+        _proxy_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=20,
+            follow_redirects=True,
+            verify=False,
+            limits=httpx.Limits(max_keepalive_connections=16),
+        )
+    return _proxy_client
+
+async def close_proxy_client():
+    global _proxy_client
+    if _proxy_client is not None:
+        await _proxy_client.aclose()
+        _proxy_client = None
+
+def get_groq_async_client():
+    """Lazily create the pooled AsyncClient for Groq calls made from coroutines."""
+    global _groq_async_client
+    if _groq_async_client is None:
+        _groq_async_client = httpx.AsyncClient(
+            base_url=GROQ_API_BASE,
+            http2=HTTP2_AVAILABLE,
+            timeout=20,
+            verify=SSL_VERIFY,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        )
+    return _groq_async_client
+
+async def close_groq_async_client():
+    global _groq_async_client
+    if _groq_async_client is not None:
+        await _groq_async_client.aclose()
+        _groq_async_client = None
+
+def get_groq_client():
+    """Lazily create the pooled sync Client shared by every chunk worker thread (keep-alive, no per-call TLS handshake)."""
+    global _groq_client
+    if _groq_client is None:
+        with _groq_client_lock:
+            if _groq_client is None:
+                _groq_client = httpx.Client(
+                    base_url=GROQ_API_BASE,
+                    http2=HTTP2_AVAILABLE,
+                    timeout=httpx.Timeout(300.0, connect=10.0),
+                    verify=SSL_VERIFY,
+                    # Admission control caps requests at GROQ_CONCURRENCY, so that many warm connections
+                    # cover every worker (fewer still when HTTP/2 multiplexes streams onto one socket)
+                    limits=httpx.Limits(max_connections=GROQ_CONCURRENCY, max_keepalive_connections=GROQ_CONCURRENCY, keepalive_expiry=120),
+                )
+    return _groq_client
+
+def close_groq_client():
+    global _groq_client
+    with _groq_client_lock:
+        if _groq_client is not None:
+            _groq_client.close()
+            _groq_client = None
+
+def is_transient_error(exc: Exception) -> bool:
+    """Network failures and Groq 5xx: the key is fine, so retry it rather than rotating to the next one."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+def transient_backoff(streak: int) -> float:
+    """Full-jitter delay before retrying the same key after the streak-th transient failure in a row."""
+    return random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * (2 ** min(streak, 6))))
+
+def retry_after_seconds(response, default: float) -> float:
+    """How long a 429 asks us to wait: Retry-After (seconds or HTTP date), else Groq's 'try again in' hint."""
+    retry_after = response.headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    try:
+        msg = response_json(response).get("error", {}).get("message", "")
+        match = RE_RETRY_AFTER.search(msg)
+        if match:
+            return int(match.group(1) or 0) * 60 + float(match.group(2))
+    except Exception:
+        pass
+    return default
+
 # ─── Groq Transcription Engine ───────────────────────────────────────────────
+# Full-jitter backoff after a 429: sleep uniform(0, min(cap, base * 2^streak))
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_CAP = 30.0
+# A chunk parked on 429-cooled keys logs "Keys exhausted" at most this often (seconds)
+KEY_EXHAUSTED_LOG_SECONDS = 30.0
+
+# Client-side token bucket per key, refilled at Groq's per-minute request quota.
+# A 429 halves the key's refill rate; each success claws back 1/20 of the quota (AIMD).
+GROQ_FREE_KEY_RPM = 20
+GROQ_PAID_KEY_RPM = 300
+
+# Whisper prompt length we send (Groq rejects anything over 896 characters)
+WHISPER_PROMPT_MAX_CHARS = 880
+# Always closes the Whisper prompt; RE_HALLUCINATIONS strips it if Whisper echoes it back
+WHISPER_BASE_TERMS = "Lakh, Crore, EBITDA, YoY, QoQ, PAT, Margins, Revenue."
+
+@functools.lru_cache(maxsize=64)
+def whisper_prompt(context_keywords: str) -> str:
+    """Whisper "prompt" for a job's keywords, built once per job rather than once per chunk."""
+    # Whisper API's "prompt" parameter acts as simulated prior text, NOT an instruction prompt. 
+    # Passing full sentences like "Transcribe audio accurately" causes Whisper to hallucinate those exact sentences during silent audio gaps.
+    # We now only pass a clean, natural comma-separated string of keywords.
+    # Groq Whisper has a hard 896 character prompt limit: drop whole trailing keywords
+    # rather than slicing one in half (or cutting off the financial terms)
+    budget = WHISPER_PROMPT_MAX_CHARS - len(WHISPER_BASE_TERMS) - 2
+    if len(context_keywords) > budget:
+        context_keywords = context_keywords[:budget + 1].rsplit(",", 1)[0].rstrip(", ")
+    return f"{context_keywords}, {WHISPER_BASE_TERMS}" if context_keywords else WHISPER_BASE_TERMS
+
+# An MP3 within this fraction of the requested bitrate is kept as-is rather than re-encoded
+MP3_BITRATE_TOLERANCE = 0.10
+
+# Chunks with at most this many segments are too short for turn-taking and skip diarization
+SINGLE_SPEAKER_MAX_SEGMENTS = 3
+
+# Diarization retry budgets before falling back to a single "Unknown Speaker" block
+DIARIZATION_MAX_PARSE_FAILS = 5
+DIARIZATION_MAX_RATE_LIMITS = 30
+
+# Diarization batching: short chunks share one LLM request, up to these limits
+DIARIZATION_BATCH_MAX_CHUNKS = 4
+DIARIZATION_BATCH_MAX_SEGMENTS = 150
+DIARIZATION_BATCH_WAIT = 3.0  # Seconds a lone chunk waits for company before flushing itself
+
+# Diarization system prompts are fixed strings; the meeting name travels in the user message,
+# so every request starts with the same bytes and provider-side prefix caching can engage
+DIARIZE_SYSTEM_PROMPT = (
+    "You are an elite transcription editor for the meeting named in the request.\n"
+    "You are given a raw transcript segment with [ID: XX] tags.\n"
+    "Your task is to identify the precise speaker for each segment based on context, flow, and provided keywords.\n"
+    "CRITICAL RULES:\n"
+    "1. You MUST return your response ONLY as a JSON object with a single key 'speaker_changes'.\n"
+    "2. 'speaker_changes' must be a list of objects containing 'id' (the integer ID where a NEW speaker begins) and 'speaker' (their deduced true name).\n"
+    "3. If the speaker does not change between consecutive IDs, do NOT add a new entry for every ID. Only add an entry when the speaker visibly CHANGES.\n"
+    "4. NEVER invent or write actual dialogue. Just map the changes.\n"
+    "5. The context keywords are hints. Use them to map speakers like CEO, CFO, etc.\n"
+    'Example output: {"speaker_changes": [{"id": 0, "speaker": "Host"}, {"id": 12, "speaker": "CEO Name"}]}'
+)
+DIARIZE_BATCH_SYSTEM_PROMPT = (
+    "You are an elite transcription editor for the meeting named in the request.\n"
+    "You are given several raw transcript chunks; every segment has an [ID: CHUNK:XX] tag.\n"
+    "Your task is to identify the precise speaker for each segment based on context, flow, and provided keywords.\n"
+    "CRITICAL RULES:\n"
+    "1. You MUST return your response ONLY as a JSON object with a single key 'speaker_changes'.\n"
+    "2. 'speaker_changes' must be a list of objects containing 'id' (the \"CHUNK:XX\" tag string where a NEW speaker begins) and 'speaker' (their deduced true name).\n"
+    "3. Always add an entry for the first segment of every chunk. After that, only add an entry when the speaker visibly CHANGES.\n"
+    "4. NEVER invent or write actual dialogue. Just map the changes.\n"
+    "5. The context keywords are hints. Use them to map speakers like CEO, CFO, etc.\n"
+    'Example output: {"speaker_changes": [{"id": "3:0", "speaker": "Host"}, {"id": "3:12", "speaker": "CEO Name"}, {"id": "4:0", "speaker": "CEO Name"}]}'
+)
+
+class DiarizationBatcher:
+    """Collects per-chunk segment lists from worker threads and diarizes them in shared LLM requests."""
+    def __init__(self, format_batch):
+        self.format_batch = format_batch  # [(chunk_idx, segments)] -> {chunk_idx: text}
+        self.lock = threading.Lock()
+        self.pending = []
+        self.pending_segments = 0
+
+    def _take(self):
+        with self.lock:
+            batch, self.pending, self.pending_segments = self.pending, [], 0
+        return batch
+
+    def _run(self, batch):
+        try:
+            texts = self.format_batch([(idx, segs) for idx, segs, _ in batch])
+            for idx, _, future in batch:
+                future.set_result(texts.get(idx, ""))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+
+    def format(self, idx: int, segments: list) -> str:
+        if len(segments) >= DIARIZATION_BATCH_MAX_SEGMENTS:
+            # Long chunks already fill a request on their own
+            return self.format_batch([(idx, segments)])[idx]
+        future = Future()
+        with self.lock:
+            self.pending.append((idx, segments, future))
+            self.pending_segments += len(segments)
+            full = len(self.pending) >= DIARIZATION_BATCH_MAX_CHUNKS or self.pending_segments >= DIARIZATION_BATCH_MAX_SEGMENTS
+        if full:
+            self._run(self._take())
+        try:
+            return future.result(timeout=DIARIZATION_BATCH_WAIT)
+        except FuturesTimeout:
+            # Nobody filled the batch in time: flush whatever is waiting (another thread may already have)
+            batch = self._take()
+            if batch:
+                self._run(batch)
+            return future.result()
+
+# Bundle members that deflate can't shrink; stored as-is in the zip
+PRECOMPRESSED_SUFFIXES = {".mp3", ".m4a", ".webm", ".zip"}
+
+# Longest unbroken run the PDF writer hands to multi_cell; 50 of Helvetica 10's widest glyph still fit the page
+PDF_MAX_WORD_CHARS = 50
+
+# ─── Transcript Regexes (compiled once) ──────────────────────────────────────
+# Groq's 429 message: "Please try again in 7.5s" / "try again in 1m2.5s"
+RE_RETRY_AFTER = re.compile(r'try again in (?:(\d+)m)?(\d+\.?\d*)s')
+# "speaker 3" in any case; group 2 is the colon of a "Speaker 3:" tag that should start a new paragraph
+RE_SPEAKER = re.compile(r'speaker\s*(\d+)(\s*:)?', re.IGNORECASE)
+# Runs of spaces (group 1) or blank-line runs (group 2), collapsed in one scan
+RE_WHITESPACE_RUNS = re.compile(r'( +)|(\n\s*\n)')
+# Untagged "Name:" / "Speaker 3:" lines the PDF writer still sets as speaker headings
+RE_PDF_SPEAKER_LINE = re.compile(r'[A-Z][\w\s\.\-]{0,40}:|(?i:Speaker\s*\d+\s*:)')
+RE_TRAILING_EMPTY_SPEAKER = re.compile(r'\[SPEAKER\]\s+Unknown Speaker\s+\[TIME\]\s+\[\d+:\d+\]\s*\n*\s*$')
+
+# Common financial terms, fixed in a single pass through one alternation
+FINANCIAL_TERMS = {
+    'ebitda': 'EBITDA', 'roe': 'ROE', 'roa': 'ROA',
+    'roce': 'ROCE', 'cagr': 'CAGR', 'pat': 'PAT',
+    'pbt': 'PBT', 'eps': 'EPS', 'nav': 'NAV',
+    'aum': 'AUM', 'npa': 'NPA', 'yoy': 'YoY',
+    'qoq': 'QoQ', 'capex': 'Capex', 'opex': 'Opex',
+}
+RE_FINANCIAL_TERMS = re.compile(r'\b(' + '|'.join(map(re.escape, FINANCIAL_TERMS)) + r')\b', re.IGNORECASE)
+
+def canonical_financial_term(match) -> str:
+    return FINANCIAL_TERMS[match.group(1).lower()]
+
+RE_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s-]')
+
+# Aggressive Scrubber for Hallucinations, as one alternation
+RE_HALLUCINATIONS = re.compile("|".join([
+    # Any variation of the system prompt injected into text
+    r"Lakh,\s*Crore,\s*EBITDA,\s*YoY,\s*QoQ,\s*PAT,\s*Margins,\s*Revenue\.?",
+    r"Hello,\s*welcome!\s*This\s*is\s*a\s*highly\s*accurate.*?financial\s*presentation\.?",
+    r"\[ID:\s*\d+\]\s*{time:\s*\[\d+:\d+:\d+\]}",  # Residual tags if any leaked
+]), re.IGNORECASE)
+
+YT_VIDEO_ID_PATTERNS = [
+    re.compile(r'(?:youtube\.com/(?:watch\?v=|live/|embed/|shorts/|v/))([a-zA-Z0-9_-]{11})'),
+    re.compile(r'(?:youtu\.be/)([a-zA-Z0-9_-]{11})'),
+]
+
 class TranscriptionEngine:
     def __init__(self):
-        self.key_usage = defaultdict(lambda: {"calls": 0, "last_reset": time.time(), "cooldown_until": 0})
-        self.key_lock = threading.Lock()
+        # Per-key bookkeeping as parallel arrays indexed through _key_idx (guarded by key_lock)
+        self._key_idx: Dict[str, int] = {}
+        self._key_names: List[str] = []
+        self._key_calls = array('i')
+        self._key_last_reset = array('d')
+        self._key_cooldown = array('d')
+        self._key_banned_until = array('d')  # Part of the cooldown imposed by a 429, vs. a plain token refill
+        self._key_fail_streak = array('i')
+        self._key_tokens = array('d')
+        self._key_rate = array('d')  # Current refill rate, tokens/sec
+        self._key_max_rate = array('d')
+        self._key_refilled_at = array('d')
+        # Condition doubles as the bookkeeping lock; waiters park on it until a key re-opens
+        self.key_lock = threading.Condition()
+        # Bookkeeping slots of the current (primary, backup) key partition, refreshed when settings change it
+        self._slot_partition = None
+        self._primary_slots = array('i')
+        self._backup_slots = array('i')
         self.active_jobs: Dict[str, dict] = {}
         self.cancelled_jobs = set()
+        # Per running job, set by cancel_job so transcribe_full stops waiting on in-flight chunks at once
+        self.cancel_events: Dict[str, asyncio.Event] = {}
+        # The app's event loop, captured by transcribe_full so worker threads can post log lines to it
+        self._main_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Long-lived pools shared by every job: warm threads, and the pooled Groq client's connections stay hot.
+        # Work is network-bound, so size well past the CPU count; each job caps its own share with a semaphore.
+        pool_size = max(32, 4 * (os.cpu_count() or 1))
+        self._http_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="groq")
+        self._format_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="diarize")
+        self._read_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chunk-read")
+        # Output artifacts (PDF, TXT, MP3 copy, bundle/zip) are built here, off the event loop and in parallel
+        self._post_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="post")
+        # Admission control: parallel jobs share one budget of Groq requests and of ffmpeg encoders
+        self._groq_slots = threading.BoundedSemaphore(GROQ_CONCURRENCY)
+        self._ffmpeg_slots = asyncio.Semaphore(os.cpu_count() or 1)
+        # Per-company metadata keywords, so repeat companies skip the LLM round-trip
+        self._kw_cache: Dict[str, dict] = self._load_keyword_cache()
+        self.keyword_writer = DebouncedWriter(KEYWORD_CACHE_FILE, lambda: dumps_json(self._kw_cache))
+
+    @staticmethod
+    def _load_keyword_cache() -> dict:
+        if KEYWORD_CACHE_FILE.exists():
+            try:
+                return loads_json(KEYWORD_CACHE_FILE.read_bytes())
+            except Exception:
+                pass
+        return {}
+
+    def _key_slot(self, key: str) -> int:
+        """Index of a key's bookkeeping slot, allocated on first sight. Caller holds key_lock."""
+        idx = self._key_idx.get(key)
+        if idx is None:
+            idx = len(self._key_names)
+            self._key_idx[key] = idx
+            self._key_names.append(key)
+            self._key_calls.append(0)
+            self._key_last_reset.append(time.time())
+            self._key_cooldown.append(0.0)
+            self._key_banned_until.append(0.0)
+            self._key_fail_streak.append(0)
+            rpm = GROQ_PAID_KEY_RPM if key in settings_manager.settings.get("paid_api_keys", []) else GROQ_FREE_KEY_RPM
+            self._key_tokens.append(float(rpm))
+            self._key_rate.append(rpm / 60.0)
+            self._key_max_rate.append(rpm / 60.0)
+            self._key_refilled_at.append(time.time())
+        return idx
+
+    def _refill_tokens(self, idx: int, now: float) -> float:
+        """Top up a key's bucket for the time elapsed and return its tokens. Caller holds key_lock."""
+        capacity = self._key_max_rate[idx] * 60
+        tokens = min(capacity, self._key_tokens[idx] + (now - self._key_refilled_at[idx]) * self._key_rate[idx])
+        self._key_tokens[idx] = tokens
+        self._key_refilled_at[idx] = now
+        return tokens
+
+    def _token_ready_at(self, idx: int, now: float) -> float:
+        """When the key will next hold a whole token. Caller holds key_lock."""
+        tokens = self._refill_tokens(idx, now)
+        return now if tokens >= 1 else now + (1 - tokens) / self._key_rate[idx]
+
+    def _backoff_after_429(self, key: str, retry_after: float) -> float:
+        """Mark a key globally exhausted and return a full-jitter sleep, so threads hitting 429 together don't wake together."""
+        with self.key_lock:
+            idx = self._key_slot(key)
+            streak = self._key_fail_streak[idx] = self._key_fail_streak[idx] + 1
+            self._key_rate[idx] = max(self._key_max_rate[idx] / 16, self._key_rate[idx] / 2)
+            self._key_tokens[idx] = 0.0
+            delay = random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * (2 ** min(streak, 6))))
+            self._key_cooldown[idx] = self._key_banned_until[idx] = time.time() + max(retry_after, delay)
+        return delay
+
+    def _take_token(self, key: str) -> bool:
+        """Spend a token from this specific key if it's open. Used to retry a transient failure on the same key."""
+        with self.key_lock:
+            idx = self._key_slot(key)
+            now = time.time()
+            if now < self._key_cooldown[idx] or self._refill_tokens(idx, now) < 1:
+                return False
+            self._key_calls[idx] += 1
+            self._key_tokens[idx] -= 1
+            return True
+
+    def _report_key_success(self, key: str):
+        with self.key_lock:
+            idx = self._key_slot(key)
+            self._key_fail_streak[idx] = 0
+            self._key_rate[idx] = min(self._key_max_rate[idx], self._key_rate[idx] + self._key_max_rate[idx] / 20)
+
+    def _wait_for_key(self, until: float):
+        """Park until `until` (a key's cooldown end) or until woken early by wake_key_waiters."""
+        with self.key_lock:
+            timeout = until - time.time()
+            if timeout > 0:
+                self.key_lock.wait(timeout=timeout)
+
+    def cancel_job(self, job_id: str):
+        """Flag a job cancelled: worker threads see the flag, transcribe_full's event fires immediately."""
+        self.cancelled_jobs.add(job_id)
+        event = self.cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        self.wake_key_waiters()
+
+    def wake_key_waiters(self):
+        """Re-check immediately: keys were added/changed or a job was cancelled."""
+        with self.key_lock:
+            self.key_lock.notify_all()
 
-    def _report_key_cooldown(self, key: str, wait_time: float):
-        """Marks a key as globally exhausted for a specific duration across all threads."""
+    def _is_rate_limited(self, key: str) -> bool:
+        """True while a key sits out a 429 cooldown (not merely waiting for its bucket to refill)."""
         with self.key_lock:
-            self.key_usage[key]["cooldown_until"] = time.time() + wait_time
+            return time.time() < self._key_banned_until[self._key_slot(key)]
+
+    def _cooldown_until(self, key: str) -> float:
+        """Timestamp until which a key is globally locked (0 if never rate-limited)."""
+        with self.key_lock:
+            return self._key_cooldown[self._key_slot(key)]
 
     def _get_next_key(self, keys: list) -> Optional[str]:
         """Round-robin key selection with strict global rate limit awareness and a 25% backup redundancy layer."""
@@ -285,71 +1024,136 @@ class TranscriptionEngine:
         with self.key_lock:
             now = time.time()
             
-            # --- FALLBACK SYSTEM 1: Strict 25% Key Reserve ---
-            paid_keys = settings_manager.settings.get("paid_api_keys", [])
-            free_keys = settings_manager.settings.get("free_api_keys", [])
-            
-            backup_count = 0
-            if free_keys:
-                backup_count = max(1, int(len(free_keys) * 0.25))
-                # If they only have 1 key, we can't reserve it as backup
-                if backup_count >= len(free_keys):
-                    backup_count = 0 if len(free_keys) == 1 else 1
-
-            if backup_count > 0:
-                backup_keys = free_keys[-backup_count:]
-                primary_free = free_keys[:-backup_count]
-            else:
-                backup_keys = []
-                primary_free = free_keys
-                
-            primary_keys = paid_keys + primary_free
+            # --- FALLBACK SYSTEM 1: Strict 25% Key Reserve (split cached by SettingsManager) ---
+            # Slot indices are resolved once per partition, not re-looked-up on every call
+            partition = settings_manager.get_key_partition()
+            if partition is not self._slot_partition:
+                self._slot_partition = partition
+                self._primary_slots = array('i', map(self._key_slot, partition[0]))
+                self._backup_slots = array('i', map(self._key_slot, partition[1]))
+            primary, backup = self._primary_slots, self._backup_slots
+            calls, last_reset, cooldown = self._key_calls, self._key_last_reset, self._key_cooldown
             
-            # Reset call states over time
-            for k in (primary_keys + backup_keys):
-                usage = self.key_usage[k]
-                if now - usage["last_reset"] > 60:
-                    usage["calls"] = 0
-                    usage["last_reset"] = now
-
-            # Filter natively available keys
-            available_primary = [k for k in primary_keys if now >= self.key_usage[k].get("cooldown_until", 0)]
-            available_backup = [k for k in backup_keys if now >= self.key_usage[k].get("cooldown_until", 0)]
+            def least_used(slots):
+                # Single pass: first natively available key (not cooling down, holding a token) with the fewest calls
+                best, best_calls = -1, 0
+                for i in slots:
+                    if now < cooldown[i] or self._refill_tokens(i, now) < 1:
+                        continue
+                    # Reset call states over time, lazily for the keys actually considered
+                    if now - last_reset[i] > 60:
+                        calls[i] = 0
+                        last_reset[i] = now
+                    if best < 0 or calls[i] < best_calls:
+                        best, best_calls = i, calls[i]
+                return best
             
-            best_key = None
-            if available_primary:
-                # Prioritize primary rotation
-                best_key = min(available_primary, key=lambda k: self.key_usage[k]["calls"])
-            elif available_backup:
+            # Prioritize primary rotation
+            best = least_used(primary)
+            if best < 0:
                 # FALLBACK FLIPPED: Primary exhausted. Start utilizing untouched backup keys to keep pipeline alive.
-                best_key = min(available_backup, key=lambda k: self.key_usage[k]["calls"])
-            else:
+                best = least_used(backup)
+            if best < 0:
                 # If ALL APIs (Primary + Backup) are globally hard-banned, return the one closest to waking up 
-                all_configured = primary_keys + backup_keys
+                all_configured = [*primary, *backup]
                 if not all_configured: return None
-                return min(all_configured, key=lambda k: self.key_usage[k].get("cooldown_until", 0))
+                ready_at = {i: max(cooldown[i], self._token_ready_at(i, now)) for i in all_configured}
+                soonest = min(all_configured, key=ready_at.__getitem__)
+                # An empty bucket counts as cooldown, so the caller sleeps until the refill instead of hitting 429
+                cooldown[soonest] = ready_at[soonest]
+                return self._key_names[soonest]
 
-            if best_key:
-                self.key_usage[best_key]["calls"] += 1
-            return best_key
+            calls[best] += 1
+            self._key_tokens[best] -= 1
+            return self._key_names[best]
 
     def _extract_video_id(self, url: str) -> Optional[str]:
         """Extract YouTube video ID from various URL formats."""
-        import re
-        patterns = [
-            r'(?:youtube\.com/(?:watch\?v=|live/|embed/|shorts/|v/))([a-zA-Z0-9_-]{11})',
-            r'(?:youtu\.be/)([a-zA-Z0-9_-]{11})',
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in YT_VIDEO_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         return None
 
+    @staticmethod
+    def _is_audio_response(resp) -> bool:
+        """Reject error pages from dead proxy instances on headers alone, before reading the body."""
+        if resp.status_code != 200:
+            return False
+        content_type = resp.headers.get("content-type", "")
+        if not content_type.startswith(("audio/", "video/", "application/octet-stream")):
+            logger.warning(f"Proxy returned {content_type or 'no content-type'} instead of audio")
+            return False
+        content_length = resp.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) < PROXY_MIN_AUDIO_BYTES:
+            logger.warning(f"Proxy audio too small ({content_length} bytes)")
+            return False
+        return True
+
+    async def _stream_to_mp3(self, client, audio_url: str, mp3_path: Path) -> bool:
+        """Pipe a remote audio stream straight into ffmpeg's stdin, transcoding to MP3 as bytes arrive."""
+        convert_cmd = [*FFMPEG_BASE, "-i", "pipe:0", "-codec:a", "libmp3lame", "-b:a", "128k", "-f", "mp3", str(mp3_path)]
+        # DEVNULL for output: nobody drains ffmpeg's pipes while we are busy feeding stdin
+        proc = await asyncio.create_subprocess_exec(
+            *convert_cmd, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        streamed = False
+        try:
+            async with client.stream("GET", audio_url, headers=PROXY_AUDIO_HEADERS, timeout=120) as audio_resp:
+                if self._is_audio_response(audio_resp):
+                    async for chunk in audio_resp.aiter_bytes(65536):
+                        proc.stdin.write(chunk)
+                        await proc.stdin.drain()
+                    streamed = True
+        except Exception as e:
+            logger.warning(f"Proxy audio stream failed: {e}")
+        finally:
+            proc.stdin.close()
+            await proc.wait()
+            
+        if streamed and proc.returncode == 0 and mp3_path.exists() and mp3_path.stat().st_size > 10000:
+            return True
+        mp3_path.unlink(missing_ok=True)
+        return False
+
+    async def _stream_to_file(self, client, audio_url: str, out_path: Path) -> bool:
+        """Save a remote audio stream untouched, for containers Groq can ingest directly."""
+        streamed = False
+        try:
+            async with client.stream("GET", audio_url, headers=PROXY_AUDIO_HEADERS, timeout=120) as audio_resp:
+                if self._is_audio_response(audio_resp):
+                    if aiofiles is not None:
+                        # Disk writes happen off the loop, overlapping with the next network read
+                        async with aiofiles.open(out_path, "wb") as f:
+                            async for chunk in audio_resp.aiter_bytes(UPLOAD_COPY_CHUNK):
+                                await f.write(chunk)
+                    else:
+                        with open(out_path, "wb") as f:
+                            async for chunk in audio_resp.aiter_bytes(65536):
+                                f.write(chunk)
+                    streamed = True
+        except Exception as e:
+            logger.warning(f"Proxy audio stream failed: {e}")
+            
+        if streamed and out_path.exists() and out_path.stat().st_size > 10000:
+            return True
+        out_path.unlink(missing_ok=True)
+        return False
+
+    async def _fetch_proxy_audio(self, client, audio_url: str, mime: str, job_id: str) -> Optional[Path]:
+        """Pass webm/m4a streams through as-is; transcode anything else to MP3 on the fly."""
+        ext = PROXY_PASSTHROUGH_EXTS.get(mime.split(";")[0].strip().lower())
+        if ext:
+            out_path = TEMP_DIR / f"{job_id}{ext}"
+            ok = await self._stream_to_file(client, audio_url, out_path)
+        else:
+            out_path = TEMP_DIR / f"{job_id}.mp3"
+            ok = await self._stream_to_mp3(client, audio_url, out_path)
+        return out_path if ok else None
+
     async def _download_via_proxy(self, video_id: str, job_id: str) -> Optional[Path]:
         """Download YouTube audio via public Invidious/Piped proxy APIs — bypasses all datacenter IP blocks."""
-        import httpx
-        
         # Multiple public proxy instances for redundancy
         invidious_instances = [
             "https://inv.nadeko.net",
@@ -368,47 +1172,35 @@ class TranscriptionEngine:
         # Try Invidious first
         for instance in invidious_instances:
             try:
-                await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"🔄 Trying proxy: {instance.split('//')[1]}..."})
-                async with httpx.AsyncClient(timeout=20, follow_redirects=True, verify=False) as client:
-                    resp = await client.get(f"{instance}/api/v1/videos/{video_id}")
-                    if resp.status_code != 200:
-                        continue
-                    data = resp.json()
-                    
-                    # Find best audio-only stream (adaptive formats)
-                    audio_url = None
-                    best_bitrate = 0
-                    for fmt in data.get("adaptiveFormats", []):
-                        if fmt.get("type", "").startswith("audio/"):
-                            bitrate = fmt.get("bitrate", 0)
-                            if bitrate > best_bitrate:
-                                best_bitrate = bitrate
-                                audio_url = fmt.get("url")
-                    
-                    if not audio_url:
-                        logger.warning(f"No audio streams found via {instance}")
-                        continue
-                    
-                    # Download the audio
-                    await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"⬇️ Downloading audio via proxy..."})
-                    audio_resp = await client.get(audio_url, timeout=120)
-                    if audio_resp.status_code == 200 and len(audio_resp.content) > 10000:
-                        # Save raw audio
-                        raw_path = TEMP_DIR / f"{job_id}_raw.webm"
-                        raw_path.write_bytes(audio_resp.content)
-                        
-                        # Convert to mp3
-                        mp3_path = TEMP_DIR / f"{job_id}.mp3"
-                        convert_cmd = [FFMPEG_PATH or "ffmpeg", "-i", str(raw_path), "-codec:a", "libmp3lame", "-b:a", "128k", "-y", str(mp3_path)]
-                        proc = await asyncio.create_subprocess_exec(*convert_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                        await proc.communicate()
-                        raw_path.unlink(missing_ok=True)
-                        
-                        if mp3_path.exists() and mp3_path.stat().st_size > 10000:
-                            await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"✅ Audio downloaded via proxy!"})
-                            return mp3_path
-                        else:
-                            mp3_path.unlink(missing_ok=True)
+                ws_manager.publish({"type": "log", "job_id": job_id, "message": f"🔄 Trying proxy: {instance.split('//')[1]}..."})
+                client = get_proxy_client()
+                resp = await client.get(f"{instance}/api/v1/videos/{video_id}")
+                if resp.status_code != 200:
+                    continue
+                data = resp.json()
+                
+                # Find best audio-only stream (adaptive formats)
+                audio_url = None
+                audio_mime = ""
+                best_bitrate = 0
+                for fmt in data.get("adaptiveFormats", []):
+                    if fmt.get("type", "").startswith("audio/"):
+                        bitrate = fmt.get("bitrate", 0)
+                        if bitrate > best_bitrate:
+                            best_bitrate = bitrate
+                            audio_url = fmt.get("url")
+                            audio_mime = fmt.get("type", "")
+                
+                if not audio_url:
+                    logger.warning(f"No audio streams found via {instance}")
+                    continue
+                
+                # Download the audio, transcoding as the bytes arrive only if Groq can't take the container
+                ws_manager.publish({"type": "log", "job_id": job_id, "message": f"⬇️ Downloading audio via proxy..."})
+                audio_path = await self._fetch_proxy_audio(client, audio_url, audio_mime, job_id)
+                if audio_path:
+                    ws_manager.publish({"type": "log", "job_id": job_id, "message": f"✅ Audio downloaded via proxy!"})
+                    return audio_path
             except Exception as e:
                 logger.warning(f"Invidious {instance} failed: {e}")
                 continue
@@ -416,40 +1208,30 @@ class TranscriptionEngine:
         # Try Piped API
         for instance in piped_instances:
             try:
-                await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"🔄 Trying Piped proxy: {instance.split('//')[1]}..."})
-                async with httpx.AsyncClient(timeout=20, follow_redirects=True, verify=False) as client:
-                    resp = await client.get(f"{instance}/streams/{video_id}")
-                    if resp.status_code != 200:
-                        continue
-                    data = resp.json()
-                    
-                    # Find audio stream
-                    audio_url = None
-                    for stream in data.get("audioStreams", []):
-                        if stream.get("url"):
-                            audio_url = stream["url"]
-                            break
-                    
-                    if not audio_url:
-                        continue
-                    
-                    await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"⬇️ Downloading audio via Piped..."})
-                    audio_resp = await client.get(audio_url, timeout=120)
-                    if audio_resp.status_code == 200 and len(audio_resp.content) > 10000:
-                        raw_path = TEMP_DIR / f"{job_id}_raw.webm"
-                        raw_path.write_bytes(audio_resp.content)
-                        
-                        mp3_path = TEMP_DIR / f"{job_id}.mp3"
-                        convert_cmd = [FFMPEG_PATH or "ffmpeg", "-i", str(raw_path), "-codec:a", "libmp3lame", "-b:a", "128k", "-y", str(mp3_path)]
-                        proc = await asyncio.create_subprocess_exec(*convert_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                        await proc.communicate()
-                        raw_path.unlink(missing_ok=True)
-                        
-                        if mp3_path.exists() and mp3_path.stat().st_size > 10000:
-                            await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"✅ Audio downloaded via Piped!"})
-                            return mp3_path
-                        else:
-                            mp3_path.unlink(missing_ok=True)
+                ws_manager.publish({"type": "log", "job_id": job_id, "message": f"🔄 Trying Piped proxy: {instance.split('//')[1]}..."})
+                client = get_proxy_client()
+                resp = await client.get(f"{instance}/streams/{video_id}")
+                if resp.status_code != 200:
+                    continue
+                data = resp.json()
+                
+                # Find audio stream
+                audio_url = None
+                audio_mime = ""
+                for stream in data.get("audioStreams", []):
+                    if stream.get("url"):
+                        audio_url = stream["url"]
+                        audio_mime = stream.get("mimeType", "")
+                        break
+                
+                if not audio_url:
+                    continue
+                
+                ws_manager.publish({"type": "log", "job_id": job_id, "message": f"⬇️ Downloading audio via Piped..."})
+                audio_path = await self._fetch_proxy_audio(client, audio_url, audio_mime, job_id)
+                if audio_path:
+                    ws_manager.publish({"type": "log", "job_id": job_id, "message": f"✅ Audio downloaded via Piped!"})
+                    return audio_path
             except Exception as e:
                 logger.warning(f"Piped {instance} failed: {e}")
                 continue
@@ -480,25 +1262,28 @@ class TranscriptionEngine:
                 await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": "⚠️ All public proxies failed, trying direct methods..."})
         
         # ═══ PYTUBEFIX (works locally, sometimes on cloud) ═══
-        if is_youtube:
+        if is_youtube and HAS_PYTUBEFIX:
             try:
-                from pytubefix import YouTube
                 def _download_pytube():
                     yt = YouTube(url, client='WEB')
                     stream = yt.streams.filter(only_audio=True).order_by('abr').first()
                     if stream:
-                        return stream.download(output_path=str(TEMP_DIR), filename=f"{job_id}.mp4")
+                        # Audio-only MP4 is M4A; name it so split/upload treat it as a Groq-native container
+                        ext = ".m4a" if stream.subtype == "mp4" else f".{stream.subtype}"
+                        return stream.download(output_path=str(TEMP_DIR), filename=f"{job_id}{ext}")
                     return None
                     
-                loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
                 audio_file = await loop.run_in_executor(None, _download_pytube)
                 
                 if audio_file:
                     audio_path = Path(audio_file)
+                    if audio_path.suffix in CHUNK_MIME_TYPES:
+                        return audio_path
                     mp3_path = audio_path.with_suffix('.mp3')
-                    convert_cmd = [FFMPEG_PATH or "ffmpeg", "-i", str(audio_path), "-codec:a", "libmp3lame", "-b:a", "128k", "-y", str(mp3_path)]
-                    proc = await asyncio.create_subprocess_exec(*convert_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                    await proc.communicate()
+                    if not await self._run_ffmpeg("-i", str(audio_path), "-codec:a", "libmp3lame", "-b:a", "128k", str(mp3_path)):
+                        # split_audio re-encodes whatever it can't stream-copy, so the original still works
+                        return audio_path
                     try:
                         audio_path.unlink(missing_ok=True)
                     except:
@@ -508,6 +1293,7 @@ class TranscriptionEngine:
                 logger.warning(f"Pytubefix download failed: {e}")
                 
         # ═══ YT-DLP (last resort, works great locally) ═══
+        cookies_file = None
         try:
             cmd = [sys.executable]
             if is_cloud:
@@ -531,37 +1317,15 @@ class TranscriptionEngine:
             
             # Apply cookies
             cookies_content = settings_manager.settings.get("youtube_cookies", "").strip()
-            if not cookies_content and is_youtube:
-                cookies_content = """# Netscape HTTP Cookie File
-# https://curl.haxx.se/rfc/cookie_spec.html
-# This is a generated file! Do not edit.
-
-.youtube.com	TRUE	/	FALSE	1804679192	HSID	A-aXQAS_DUtkVJ6gY
-.youtube.com	TRUE	/	TRUE	1804679192	SSID	AMvny_LXbARGeUgwH
-.youtube.com	TRUE	/	FALSE	1804679192	APISID	h_6o4Tb7GEuX4R-f/AisuzVJPDyknakWBB
-.youtube.com	TRUE	/	TRUE	1804679192	SAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
-.youtube.com	TRUE	/	TRUE	1804679192	__Secure-1PAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
-.youtube.com	TRUE	/	TRUE	1804679192	__Secure-3PAPISID	LRc6XyrpbzM6EYT7/A9G2ve_8SYA-y4Cnk
-.youtube.com	TRUE	/	FALSE	1804679192	SID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYsBapfAEW_lgehWjM24DU2bwACgYKAf8SARQSFQHGX2MiYChuxYvp5LTwSJJoYNz2JBoVAUF8yKp_D5fn1Yxp4RtTsDdQR3XW0076
-.youtube.com	TRUE	/	TRUE	1804679192	__Secure-1PSID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYsZY6YS95RausKFbsFsFIy3AACgYKAdwSARQSFQHGX2MirqHn6Fm4bsubz7IZc_9bsRoVAUF8yKq59r0lH1n8bO_bdeNwn-wH0076
-.youtube.com	TRUE	/	TRUE	1804679192	__Secure-3PSID	g.a0006Qg9ED9Ge9XojLbQf0YW9Z-whXYe4__3UF-JXoB0zh3ePYYs1IF4rZ9zD2SEgNkeyHtHagACgYKAbwSARQSFQHGX2MiDMWQSKzBgB5YbzL4V1bsihoVAUF8yKo9AtX51J-R_xNfY9AWHsgY0076
-.youtube.com	TRUE	/	TRUE	1804679192	LOGIN_INFO	AFmmF2swRQIgcgZgE70aAwlul_3Xq4Cb7FgHo6oumqnzvQbHiWnOBmYCIQDRK8pWscfqTu8Jn-YzlT5YfCOHwzx2Vziw3_jub1zpRg:QUQ3MjNmdzYzdVFnMkIyZTk1cGo2akloZkduMGpJaU8xYUw4V0lPSkRIeFN5S3hFUDBLVkNUc29mQkhGNkhvVXZseHY1VHpfWlZHV3lISUQ2NzJkd1VrOHI5eVhhMFhXRHlkeWU2c2w2UC1iVGhYUzQxcXY5QkVEU01XTWxtVUlKTHdJVXh5SDdPQ1k5WHJBQ2owRXIyUE9SQkVfTTRCOWh3
-.youtube.com	TRUE	/	TRUE	1806587430	PREF	f6=40000080&tz=Asia.Calcutta&f4=4000000&f7=100
-.youtube.com	TRUE	/	TRUE	1803569087	__Secure-1PSIDTS	sidts-CjUBBj1CYoBzvFZKd8Ek_AMX8EDmxnIkwRiwZ7dS2i7fMSYHO_8OuUUsAx5NopFS3PZ2bgVjOhAA
-.youtube.com	TRUE	/	TRUE	1803569087	__Secure-3PSIDTS	sidts-CjUBBj1CYoBzvFZKd8Ek_AMX8EDmxnIkwRiwZ7dS2i7fMSYHO_8OuUUsAx5NopFS3PZ2bgVjOhAA
-.youtube.com	TRUE	/	FALSE	1803569087	SIDCC	AKEyXzWmOV09wFQDsxi0XObdzrHbE-OEgCQUHjrWvVsGYB6T46kFLTnPAw2CiSg-W3VbJrW9eQ
-.youtube.com	TRUE	/	TRUE	1803569087	__Secure-1PSIDCC	AKEyXzUExAURWNcxKZfRPcu5TK_S_LqiQUGNQOmVgZ-NGHEeJX-NWJgU4N5fZ5srCWQ6Bw_YMg
-.youtube.com	TRUE	/	TRUE	1803569087	__Secure-3PSIDCC	AKEyXzVSLqE3vYV-kxHR_khPJDslxXkwwEPNxpPO0aEATGFE1wrS6MCeAqyAPk_XGqhScKFX2HM
-.youtube.com	TRUE	/	TRUE	1787517472	VISITOR_INFO1_LIVE	uyBWueKyEQU
-.youtube.com	TRUE	/	TRUE	1787517472	VISITOR_PRIVACY_METADATA	CgJJThIEGgAgZw%3D%3D
-.youtube.com	TRUE	/	TRUE	0	YSC	LEHEe6DUbIM
-.youtube.com	TRUE	/	TRUE	1787573553	__Secure-ROLLOUT_TOKEN	CN3Zu8WDp-7mgAEQucTTx7mJkQMYvM3U2c70kgM%3D"""
-
-            cookies_file = TEMP_DIR / f"{job_id}_cookies.txt"
+            cookies_file = None
             if cookies_content:
+                # Only user-supplied cookies need a per-job file
+                cookies_file = TEMP_DIR / f"{job_id}_cookies.txt"
                 with open(cookies_file, "w") as f:
                     f.write(cookies_content)
                 cmd.extend(["--cookies", str(cookies_file)])
+            elif is_youtube:
+                cmd.extend(["--cookies", str(DEFAULT_YT_COOKIES_FILE)])
                 
             cmd.extend([
                 "-o", str(TEMP_DIR / f"{job_id}.%(ext)s"),
@@ -579,7 +1343,7 @@ class TranscriptionEngine:
             stdout, stderr = await process.communicate()
             
             # Clean up temp cookies file
-            if cookies_file.exists():
+            if cookies_file:
                 try:
                     cookies_file.unlink()
                 except Exception:
@@ -592,14 +1356,13 @@ class TranscriptionEngine:
             if stdout_text:
                 logger.info(f"yt-dlp stdout: {stdout_text[-300:]}")
             
-            # Find the output file
-            for f in TEMP_DIR.iterdir():
-                if f.stem == job_id and f.suffix in ['.mp3', '.m4a', '.wav', '.webm', '.opus']:
-                    if f.suffix != '.mp3':
+            # Find the output file (the -o template pins it to "<job_id>.<ext>")
+            for f in TEMP_DIR.glob(f"{job_id}.*"):
+                if f.suffix in ['.mp3', '.m4a', '.wav', '.webm', '.opus']:
+                    if f.suffix not in CHUNK_MIME_TYPES:
                         mp3_path = f.with_suffix('.mp3')
-                        convert_cmd = [FFMPEG_PATH or "ffmpeg", "-i", str(f), "-codec:a", "libmp3lame", "-b:a", "128k", str(mp3_path)]
-                        proc = await asyncio.create_subprocess_exec(*convert_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                        await proc.communicate()
+                        if not await self._run_ffmpeg("-i", str(f), "-codec:a", "libmp3lame", "-b:a", "128k", str(mp3_path)):
+                            return f
                         f.unlink()
                         return mp3_path
                     return f
@@ -625,42 +1388,67 @@ class TranscriptionEngine:
         except Exception as e:
             await ws_manager.broadcast({"type": "error", "job_id": job_id, "message": f"❌ Download error: {str(e)}"})
             logger.error(f"Download error: {e}")
-            cookies_file = TEMP_DIR / f"{job_id}_cookies.txt"
-            if cookies_file.exists():
+            if cookies_file:
                 try:
                     cookies_file.unlink()
                 except Exception:
                     pass
             return None
 
-    def split_audio(self, audio_path: Path, chunk_minutes: int, job_id: str) -> List[Path]:
-        """Split audio into perfect MP3 chunks with strict isolation by Job ID."""
-        import subprocess
-        
-        chunk_seconds = chunk_minutes * 60
-        # Force MP3 output to ensure Groq Whisper compatibility
-        ext = ".mp3"
-        # Using job_id for absolute isolation so concurrent transcripions never collide chunks
-        output_pattern = str(TEMP_DIR / f"job_{job_id}_chunk_%04d{ext}")
-        
+    async def _probe_audio_stream(self, audio_path: Path):
+        """Return (codec_name, bit_rate) of the first audio stream, or (None, 0) if ffprobe is unavailable."""
+        if not FFPROBE_PATH:
+            return None, 0
+        # Container-level bit_rate: WebM/Matroska doesn't record one per stream
         cmd = [
-            FFMPEG_PATH or "ffmpeg",
-            "-i", str(audio_path),
-            "-f", "segment",
-            "-segment_time", str(chunk_seconds),
-            "-c:a", "libmp3lame",
-            "-b:a", "64k",  # 64k is perfectly fine for speech recognition
-            output_pattern
+            FFPROBE_PATH, "-v", "error", "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name:format=bit_rate", "-of", "default=noprint_wrappers=1",
+            str(audio_path)
         ]
-        
         try:
-            # DEVNULL prevents any stdout/stderr buffer deadlocks
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            chunks = sorted(TEMP_DIR.glob(f"job_{job_id}_chunk_*{ext}"))
-            return chunks
-        except subprocess.CalledProcessError as e:
+            proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+            stdout, _ = await proc.communicate()
+            if proc.returncode != 0:
+                return None, 0
+            fields = dict(line.partition("=")[::2] for line in stdout.decode(errors='replace').splitlines())
+            bit_rate = fields.get("bit_rate", "")
+            return fields.get("codec_name") or None, int(bit_rate) if bit_rate.isdigit() else 0
+        except OSError:
+            return None, 0
+
+    async def split_audio(self, audio_path: Path, chunk_minutes: int, job_id: str) -> List[Path]:
+        """Split audio into Groq-compatible chunks with strict isolation by Job ID."""
+        chunk_seconds = chunk_minutes * 60
+        # MP3/Opus/AAC sources only need cutting, not re-encoding, as long as each chunk stays under Groq's upload cap
+        codec, bit_rate = await self._probe_audio_stream(audio_path)
+        copy_ext = STREAM_COPY_EXTS.get(codec)
+        stream_copy = copy_ext is not None and 0 < bit_rate * chunk_seconds / 8 <= GROQ_MAX_CHUNK_BYTES
+        
+        if stream_copy:
+            copy_pattern = str(TEMP_DIR / f"job_{job_id}_chunk_%04d{copy_ext}")
+            if await self._run_ffmpeg(
+                "-i", str(audio_path), "-vn", "-f", "segment", "-segment_time", str(chunk_seconds),
+                "-c", "copy", "-reset_timestamps", "1", copy_pattern
+            ):
+                return sorted(TEMP_DIR.glob(f"job_{job_id}_chunk_*{copy_ext}"))
+            # Odd streams (bad frames, missing headers) can refuse a copy: discard partial parts and re-encode
+            logger.warning(f"Stream-copy split failed on {audio_path.name}; re-encoding instead")
+            for partial in TEMP_DIR.glob(f"job_{job_id}_chunk_*{copy_ext}"):
+                partial.unlink(missing_ok=True)
+        
+        # Anything else is re-encoded to MP3 to ensure Groq Whisper compatibility.
+        # Using job_id for absolute isolation so concurrent transcripions never collide chunks
+        async with self._ffmpeg_slots:
+            encoded = await self._run_ffmpeg(
+                "-i", str(audio_path), "-vn", "-f", "segment", "-segment_time", str(chunk_seconds),
+                "-c:a", "libmp3lame",
+                "-b:a", "64k",  # 64k is perfectly fine for speech recognition
+                str(TEMP_DIR / f"job_{job_id}_chunk_%04d.mp3")
+            )
+        if not encoded:
             logger.error(f"FFmpeg split failed on {audio_path.name}")
             return []
+        return sorted(TEMP_DIR.glob(f"job_{job_id}_chunk_*.mp3"))
 
     async def generate_metadata_keywords(self, company_name: str, job_id: str) -> dict:
         """Fetch separate keyword sets for Whisper (technical) and Llama (contextual)."""
@@ -671,8 +1459,13 @@ class TranscriptionEngine:
         if not all_keys:
             return {"whisper": "", "llama": ""}
             
+        cache_key = company_name.lower().strip()
+        cached = self._kw_cache.get(cache_key)
+        if cached and time.time() - cached.get("ts", 0) < KEYWORD_CACHE_TTL:
+            await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"🔍 AI Agent: Reusing cached context/speaker keywords for '{company_name}'."})
+            return {"whisper": cached.get("whisper", ""), "llama": cached.get("llama", "")}
+            
         key = all_keys[0]
-        import httpx
         
         await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"🔍 AI Agent: Generating context/speaker keywords for '{company_name}'..."})
         
@@ -683,10 +1476,11 @@ class TranscriptionEngine:
         )
         
         try:
-            response = httpx.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={"Authorization": f"Bearer {key}"},
-                json={
+            # Awaited on the shared client so other jobs keep running during the round-trip
+            response = await get_groq_async_client().post(
+                "/chat/completions",
+                headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+                content=dumps_json({
                     "model": "llama-3.3-70b-versatile",
                     "messages": [
                         {"role": "system", "content": system_prompt},
@@ -694,49 +1488,57 @@ class TranscriptionEngine:
                     ],
                     "response_format": {"type": "json_object"},
                     "temperature": 0.2
-                },
-                timeout=20,
-                verify=str(cert_path) if cert_path.exists() else True
+                })
             )
             if response.status_code == 200:
-                data = response.json().get("choices", [{}])[0].get("message", {}).get("content", "{}")
-                parsed = json.loads(data)
-                return {
+                data = response_json(response).get("choices", [{}])[0].get("message", {}).get("content", "{}")
+                parsed = loads_json(data)
+                keywords = {
                     "whisper": parsed.get("whisper", ""),
                     "llama": parsed.get("llama", "")
                 }
+                if keywords["whisper"] or keywords["llama"]:
+                    self._kw_cache[cache_key] = {**keywords, "ts": time.time()}
+                    self.keyword_writer.request()
+                return keywords
             return {"whisper": "", "llama": ""}
         except Exception as e:
             logger.error(f"Failed to generate metadata keywords: {e}")
             return {"whisper": "", "llama": ""}
 
-    def smart_format_chunk_sync(self, segments_data: list, job_id: str, company_name: str, context_keywords: str, all_keys: list) -> str:
-        """Intelligently identify speakers and format dialogue without dropping a single word."""
-        import httpx
-        import json
-        
-        if not segments_data:
-            return ""
-            
-        # Build raw text prompt
-        raw_text_to_process = ""
-        for s in segments_data:
-            raw_text_to_process += f"[ID: {s['id']}] {{time: {s['time_str']}}} {s['text']}\n"
-            
-        system_prompt = (
-            f"You are an elite transcription editor for the '{company_name}' meeting.\n"
-            "You are given a raw transcript segment with [ID: XX] tags.\n"
-            "Your task is to identify the precise speaker for each segment based on context, flow, and provided keywords.\n"
-            "CRITICAL RULES:\n"
-            "1. You MUST return your response ONLY as a JSON object with a single key 'speaker_changes'.\n"
-            "2. 'speaker_changes' must be a list of objects containing 'id' (the integer ID where a NEW speaker begins) and 'speaker' (their deduced true name).\n"
-            "3. If the speaker does not change between consecutive IDs, do NOT add a new entry for every ID. Only add an entry when the speaker visibly CHANGES.\n"
-            "4. NEVER invent or write actual dialogue. Just map the changes.\n"
-            "5. The context keywords are hints. Use them to map speakers like CEO, CFO, etc.\n"
-            'Example output: {"speaker_changes": [{"id": 0, "speaker": "Host"}, {"id": 12, "speaker": "CEO Name"}]}'
-        )
-        user_prompt = f"Key Executives & Context: {context_keywords}\n\nTranscript Segment:\n{raw_text_to_process}"
-        
+    @staticmethod
+    def _diarization_cache_path(system_prompt: str, user_prompt: str) -> Path:
+        digest = hashlib.sha256(f"{system_prompt}\0{user_prompt}".encode('utf-8')).hexdigest()
+        return DIARIZATION_CACHE_DIR / f"{digest}.json"
+
+    @staticmethod
+    def prune_diarization_cache():
+        """Drop cached speaker-change lists older than DIARIZATION_CACHE_TTL."""
+        cutoff = time.time() - DIARIZATION_CACHE_TTL
+        for entry in os.scandir(DIARIZATION_CACHE_DIR):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def _speaker_changes_sync(self, system_prompt: str, user_prompt: str, job_id: str, all_keys: list) -> Optional[list]:
+        """Speaker-change list for a prompt: from the on-disk cache, else asked of the LLM."""
+        cache_path = self._diarization_cache_path(system_prompt, user_prompt)
+        try:
+            return loads_json(cache_path.read_bytes())
+        except (OSError, ValueError):
+            pass
+        changes = self._request_speaker_changes(system_prompt, user_prompt, job_id, all_keys)
+        if changes:
+            try:
+                atomic_write_bytes(cache_path, dumps_json(changes))
+            except OSError as e:
+                logger.debug(f"Diarization cache write failed: {e}")
+        return changes
+
+    def _request_speaker_changes(self, system_prompt: str, user_prompt: str, job_id: str, all_keys: list) -> Optional[list]:
+        """Ask the LLM for a speaker-change list, rotating keys/models until it parses. None if the job was cancelled."""
         # 3-Tier Fallback Models
         models_to_try = [
             "llama-3.3-70b-versatile",
@@ -746,68 +1548,78 @@ class TranscriptionEngine:
         
         attempt = 0
         model_idx = 0
-        speaker_map = {}
+        # Separate budgets: bad JSON gets corrective feedback, 429s get backoff; both give up into single-speaker mode
+        parse_fails = 0
+        rate_limits = 0
+        temperature = 0.05
+        # Set after a network error/5xx: the next attempt reuses this key instead of rotating
+        retry_key = None
+        transient_streak = 0
         
         while attempt < 100:
             if job_id in self.cancelled_jobs:
-                return raw_text_to_process
+                return None
+            if parse_fails >= DIARIZATION_MAX_PARSE_FAILS or rate_limits >= DIARIZATION_MAX_RATE_LIMITS:
+                logger.warning(f"Diarization gave up ({parse_fails} bad JSON replies, {rate_limits} rate limits); using single-speaker fallback.")
+                return []
                 
             current_model = models_to_try[model_idx % len(models_to_try)]
-            api_key = self._get_next_key(all_keys)
+            api_key = retry_key if retry_key and self._take_token(retry_key) else self._get_next_key(all_keys)
+            retry_key = None
             if not api_key:
                 time.sleep(1)
                 continue
+
+            # Every bucket empty: the soonest key came back without a token, so park until it opens
+            # (a wait is neither an attempt nor a rate limit; the loop top re-checks for cancel)
+            key_cooldown = self._cooldown_until(api_key)
+            if key_cooldown > time.time():
+                self._wait_for_key(key_cooldown)
+                continue
                 
             try:
-                verify = str(cert_path) if cert_path.exists() else True
-                response = httpx.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                    json={
-                        "model": current_model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "response_format": {"type": "json_object"},
-                        "temperature": 0.05,
-                        "max_tokens": 8000
-                    },
-                    timeout=180,
-                    verify=verify
-                )
+                with self._groq_slots:
+                    response = get_groq_client().post(
+                        "/chat/completions",
+                        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                        content=dumps_json({
+                            "model": current_model,
+                            "messages": [
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            "response_format": {"type": "json_object"},
+                            "temperature": temperature,
+                            "max_tokens": 8000
+                        }),
+                        timeout=180
+                    )
                 
                 # Handle Rate Limits
                 if response.status_code == 429:
-                    wait_time = 1.5
-                    retry_after = response.headers.get("retry-after")
-                    if retry_after:
-                        try: wait_time = float(retry_after)
-                        except: pass
-                    else:
-                        try:
-                            msg = response.json().get("error", {}).get("message", "")
-                            match = re.search(r'try again in (\d+\.?\d*)s', msg)
-                            if match: wait_time = float(match.group(1))
-                        except: pass
-                    
-                    self._report_key_cooldown(api_key, wait_time)
-                    time.sleep(1)
+                    wait_time = retry_after_seconds(response, 1.5)
+                    time.sleep(self._backoff_after_429(api_key, wait_time))
+                    rate_limits += 1
                     attempt += 1  
                     continue
                 
                 # Handle Success
                 if response.status_code == 200:
-                    raw_json = response.json()["choices"][0]["message"]["content"].strip()
+                    self._report_key_success(api_key)
+                    transient_streak = 0
+                    # JSON allows surrounding whitespace, so the content is parsed as-is without a .strip() copy
+                    raw_json = response_json(response)["choices"][0]["message"]["content"]
                     try:
-                        parsed = json.loads(raw_json)
-                        changes = parsed.get("speaker_changes", [])
-                        for change in changes:
-                            speaker_map[int(change["id"])] = change["speaker"]
-                        break # Success!
+                        parsed = loads_json(raw_json)
+                        return parsed.get("speaker_changes", [])
                     except Exception as e:
                         logger.debug(f"JSON Parse failed on {current_model}: {e}. Retrying...")
+                        parse_fails += 1
                         attempt += 1
+                        if parse_fails == 2:
+                            # Feed the failure back instead of retrying blind, and stop sampling
+                            system_prompt += f"\nYour previous output was invalid JSON ({str(e)[:200]}). Output ONLY the JSON object."
+                            temperature = 0.0
                         continue
                 
                 # Handle Bad Request (400) or other errors
@@ -819,10 +1631,12 @@ class TranscriptionEngine:
                     time.sleep(1)
                     continue
                 
-                # Generic fallback for other status codes
+                # Generic fallback for other status codes (a 5xx is the model's problem, not the key's)
                 logger.error(f"Unexpected Groq Status {response.status_code} on {current_model}. Hopping...")
                 model_idx += 1
                 attempt += 1
+                if response.status_code >= 500:
+                    retry_key = api_key
                 time.sleep(2)
                 
             except Exception as e:
@@ -830,11 +1644,19 @@ class TranscriptionEngine:
                 if attempt % 5 == 0:
                     logger.debug(f"Smart format glitch on {current_model}: {e}. Rotating...")
                     model_idx += 1
-                time.sleep(2)
+                if is_transient_error(e):
+                    retry_key = api_key
+                    transient_streak += 1
+                    time.sleep(transient_backoff(transient_streak))
+                else:
+                    time.sleep(2)
 
-        
-        # Assemble perfectly untouched text
-        final_text = ""
+        return []
+
+    @staticmethod
+    def _assemble_dialogue(segments_data: list, speaker_map: dict) -> str:
+        """Rebuild the chunk's untouched text, opening a [SPEAKER]/[TIME] block wherever the speaker changes."""
+        parts = []
         current_speaker = "Unknown Speaker"
         
         for s in segments_data:
@@ -846,170 +1668,210 @@ class TranscriptionEngine:
                 
             if sid in speaker_map:
                 current_speaker = speaker_map[sid]
-                final_text += f"\n\n[SPEAKER] {current_speaker}\n[TIME] {s['time_str']}\n"
+                parts.append(f"\n\n[SPEAKER] {current_speaker}\n[TIME] {s['time_str']}\n")
                 
-            final_text += f"{s['text']} "
+            parts.append(f"{s['text']} ")
             
         # Clean up
-        final_text = final_text.replace("\n ", "\n").strip()
-        return final_text
+        return "".join(parts).replace("\n ", "\n").strip()
 
-    def transcribe_chunk(self, chunk_path: Path, job_id: str, all_keys: list, model: str = "whisper-large-v3", context_keywords: str = "") -> dict:
-        """Transcribe a single audio chunk using Groq API."""
-        import httpx
+    def smart_format_chunk_sync(self, segments_data: list, job_id: str, company_name: str, context_keywords: str, all_keys: list) -> str:
+        """Intelligently identify speakers and format dialogue without dropping a single word."""
+        if not segments_data:
+            return ""
+            
+        # Build raw text prompt
+        raw_text_to_process = "".join(f"[ID: {s['id']}] {{time: {s['time_str']}}} {s['text']}\n" for s in segments_data)
+            
+        user_prompt = f"Meeting: {company_name}\nKey Executives & Context: {context_keywords}\n\nTranscript Segment:\n{raw_text_to_process}"
         
+        changes = self._speaker_changes_sync(DIARIZE_SYSTEM_PROMPT, user_prompt, job_id, all_keys)
+        if changes is None:
+            return raw_text_to_process
+            
+        speaker_map = {}
+        for change in changes:
+            try:
+                speaker_map[int(change["id"])] = change["speaker"]
+            except (KeyError, TypeError, ValueError):
+                continue
+        return self._assemble_dialogue(segments_data, speaker_map)
+
+    def smart_format_batch_sync(self, batch: list, job_id: str, company_name: str, context_keywords: str, all_keys: list) -> Dict[int, str]:
+        """Diarize several chunks in one LLM request; batch is [(chunk_idx, segments_data)], result maps chunk_idx -> text."""
+        if len(batch) == 1:
+            idx, segments_data = batch[0]
+            return {idx: self.smart_format_chunk_sync(segments_data, job_id, company_name, context_keywords, all_keys)}
+            
+        # Segment IDs are namespaced "chunk:id" so one response can address every chunk
+        parts = []
+        for idx, segments_data in batch:
+            parts.append(f"--- CHUNK {idx} ---\n")
+            parts.extend(f"[ID: {idx}:{s['id']}] {{time: {s['time_str']}}} {s['text']}\n" for s in segments_data)
+        raw_text_to_process = "".join(parts)
+                
+        user_prompt = f"Meeting: {company_name}\nKey Executives & Context: {context_keywords}\n\nTranscript Chunks:\n{raw_text_to_process}"
+        
+        changes = self._speaker_changes_sync(DIARIZE_BATCH_SYSTEM_PROMPT, user_prompt, job_id, all_keys)
+        if changes is None:
+            return {idx: "\n".join(f"[ID: {s['id']}] {{time: {s['time_str']}}} {s['text']}" for s in segments_data) for idx, segments_data in batch}
+            
+        speaker_maps = {idx: {} for idx, _ in batch}
+        for change in changes:
+            try:
+                chunk_idx, _, sid = str(change["id"]).partition(":")
+                speaker_maps[int(chunk_idx)][int(sid)] = change["speaker"]
+            except (KeyError, TypeError, ValueError):
+                continue
+        return {idx: self._assemble_dialogue(segments_data, speaker_maps[idx]) for idx, segments_data in batch}
+
+    @staticmethod
+    def _chunk_upload_url(chunk_path: Path) -> Optional[str]:
+        """URL Groq can fetch this chunk from, if it was published to object storage (a companion '<chunk>.url' file)."""
+        url_file = chunk_path.with_name(chunk_path.name + ".url")
+        try:
+            url = url_file.read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+        return url if url.startswith(("https://", "http://")) else None
+
+    def transcribe_chunk(self, chunk_path: Path, job_id: str, all_keys: list, model: str = "whisper-large-v3", context_keywords: str = "", audio_bytes: Optional[bytes] = None) -> dict:
+        """Transcribe a single audio chunk using Groq API."""
         max_retries = 300 # Wait patiently instead of silently dropping the chunk!
         attempt = 0
+        # Chunks already reachable by URL are fetched by Groq itself; no upload from here
+        chunk_url = self._chunk_upload_url(chunk_path)
+        # Read once up front; 429 retries resend the same buffer instead of reopening the file
+        if audio_bytes is None and chunk_url is None:
+            try:
+                audio_bytes = chunk_path.read_bytes()
+            except OSError as e:
+                return {"text": f"[ERROR: Could not read chunk - {e}]", "error": True}
+        mime_type = CHUNK_MIME_TYPES.get(chunk_path.suffix, 'audio/mpeg')
+        
+        data = {
+            'model': model,
+            'language': 'en',
+            'response_format': 'verbose_json',
+            'prompt': whisper_prompt(context_keywords),
+            'temperature': 0.0  # STRICT deterministic float (forces factual path)
+        }
+        
+        # Frame the multipart body once; every retry resends the same bytes
+        if chunk_url:
+            body, content_type = encode_multipart({**data, 'url': chunk_url})
+        else:
+            body, content_type = encode_multipart(data, 'file', chunk_path.name, mime_type, audio_bytes)
+        del audio_bytes
+        # Set after a network error/5xx: the next attempt reuses this key instead of rotating
+        retry_key = None
+        transient_streak = 0
+        # Last time this chunk told the UI its keys were exhausted
+        last_exhausted_log = 0.0
+        
         while attempt < max_retries:
             if job_id in self.cancelled_jobs:
                 return {"text": "[CANCELLED]", "error": True}
                 
-            api_key = self._get_next_key(all_keys)
+            api_key = retry_key if retry_key and self._take_token(retry_key) else self._get_next_key(all_keys)
+            retry_key = None
             if not api_key:
                 time.sleep(1)
                 continue
             
             # Global Cooldown Assessment: Check if this key is universally locked
-            key_cooldown = self.key_usage[api_key].get("cooldown_until", 0)
+            key_cooldown = self._cooldown_until(api_key)
             now = time.time()
             if key_cooldown > now:
-                # All master keys are globally down. Check for cancel, micro-sleep dynamically and loop instantly to catch the first key that re-opens
+                # Every key is 429-cooled or out of tokens. Check for cancel, then wait for the first key that re-opens (or an early wake-up)
                 if job_id in self.cancelled_jobs:
                     return {"text": "[CANCELLED]", "error": True}
                 
-                time.sleep(min(key_cooldown - now, 2.0))
+                # Token refills are routine throttling; only a 429 cooldown is worth surfacing, and sparingly
+                rate_limited = self._is_rate_limited(api_key)
+                self._wait_for_key(key_cooldown)
                 
-                if attempt % 15 == 0:
+                if rate_limited and now - last_exhausted_log >= KEY_EXHAUSTED_LOG_SECONDS and self._main_loop is not None:
+                    last_exhausted_log = now
+                    # Worker thread: hand the log line to the app's loop (get_event_loop() here would be a fresh, dead loop)
                     try:
-                        loop = asyncio.get_event_loop()
-                        asyncio.run_coroutine_threadsafe(
-                            ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"♻️ Auto-Recovery: Keys exhausted. Retrying chunk with backup systems... ({attempt}/{max_retries})"}),
-                            loop
+                        self._main_loop.call_soon_threadsafe(
+                            ws_manager.publish,
+                            {"type": "log", "job_id": job_id, "message": f"♻️ Auto-Recovery: Keys exhausted. Retrying chunk with backup systems... ({attempt}/{max_retries})"}
                         )
-                    except: pass
+                    except RuntimeError:
+                        pass  # Loop already closed (shutdown)
                 continue
             
             try:
-                with open(chunk_path, 'rb') as f:
-                    files = {'file': (chunk_path.name, f, 'audio/mpeg')}
-                    # Whisper API's "prompt" parameter acts as simulated prior text, NOT an instruction prompt. 
-                    # Passing full sentences like "Transcribe audio accurately" causes Whisper to hallucinate those exact sentences during silent audio gaps.
-                    # We now only pass a clean, natural comma-separated string of keywords.
-                    
-                    keyword_injection = f"{context_keywords}, " if context_keywords else ""
-                    
-                    base_prompt = (
-                        f"{keyword_injection}"
-                        "Lakh, Crore, EBITDA, YoY, QoQ, PAT, Margins, Revenue."
+                with self._groq_slots:
+                    response = get_groq_client().post(
+                        "/audio/transcriptions",
+                        headers={"Authorization": f"Bearer {api_key}", "Content-Type": content_type},
+                        content=body
                     )
+                
+                if response.status_code == 429:
+                    wait_time = retry_after_seconds(response, 2.0)
+                    time.sleep(self._backoff_after_429(api_key, wait_time))
+                    attempt += 1
+                    continue
+                
+                if response.status_code == 400:
+                    try:
+                        err_data = response_json(response)
+                        err_msg = err_data.get("error", {}).get("message", "").lower()
+                        if "no speech" in err_msg or "too short" in err_msg:
+                            logger.info(f"Chunk {chunk_path.name} is silent or too short. Skipping gracefully.")
+                            return {"text": "[SILENCE]", "segments": [], "error": False}
+                    except: pass
                     
-                    # Groq Whisper has a hard 896 character prompt limit
-                    final_prompt = base_prompt[:880]
-                    
-                    data = {
-                        'model': model,
-                        'language': 'en',
-                        'response_format': 'verbose_json',
-                        'prompt': final_prompt,
-                        'temperature': 0.0  # STRICT deterministic float (forces factual path)
-                    }
-                    
-                    verify = str(cert_path) if cert_path.exists() else True
-                    
-                    response = httpx.post(
-                        "https://api.groq.com/openai/v1/audio/transcriptions",
-                        headers={"Authorization": f"Bearer {api_key}"},
-                        files=files,
-                        data=data,
-                        timeout=300,
-                        verify=verify
-                    )
-                    
-                    if response.status_code == 429:
-                        wait_time = 2.0
-                        retry_after = response.headers.get("retry-after")
-                        if retry_after:
-                            try: wait_time = float(retry_after)
-                            except: pass
-                        else:
-                            try:
-                                msg = response.json().get("error", {}).get("message", "")
-                                match = re.search(r'try again in (\d+\.?\d*)s', msg)
-                                if match: wait_time = float(match.group(1))
-                            except: pass
-                            
-                        self._report_key_cooldown(api_key, wait_time)
-                        time.sleep(2)
-                        attempt += 1
-                        continue
-                    
-                    if response.status_code == 400:
-                        try:
-                            err_data = response.json()
-                            err_msg = err_data.get("error", {}).get("message", "").lower()
-                            if "no speech" in err_msg or "too short" in err_msg:
-                                logger.info(f"Chunk {chunk_path.name} is silent or too short. Skipping gracefully.")
-                                return {"text": "[SILENCE]", "segments": [], "error": False}
-                        except: pass
-                        
-                    response.raise_for_status()
-                    return response.json()
-                    
+                response.raise_for_status()
+                self._report_key_success(api_key)
+                return response_json(response)
+                
             except Exception as e:
                 attempt += 1
                 if attempt % 15 == 0:
-                    logger.warning(f"Chunk transcription glitch (hoping to next key, attempt {attempt}): {e}")
+                    logger.warning(f"Chunk transcription glitch (attempt {attempt}): {e}")
                 
                 if job_id in self.cancelled_jobs:
                     return {"text": "[CANCELLED]", "error": True}
                     
-                if attempt < max_retries:
-                    time.sleep(2.0)
-                else:
+                if attempt >= max_retries:
                     return {"text": f"[ERROR: Could not transcribe chunk - {str(e)}]", "error": True}
+                if is_transient_error(e):
+                    retry_key = api_key
+                    transient_streak += 1
+                    time.sleep(transient_backoff(transient_streak))
+                else:
+                    time.sleep(2.0)
         
         logger.error(f"CRITICAL: Chunk dropped because {max_retries} retries were exhausted.")
         return {"text": "[ERROR: Max retries exceeded across all keys. System abandoned chunk.]", "error": True}
 
     def post_process_transcript(self, text: str, context_keywords: str = "") -> str:
         """Apply speaker diarization regex and formatting."""
-        # Add line breaks before speaker tags
-        text = re.sub(r'(Speaker\s*\d+\s*:)', r'\n\n\1', text)
-        # Clean up multiple newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        # Capitalize speaker tags
-        text = re.sub(r'speaker\s*(\d+)', lambda m: f'Speaker {m.group(1)}', text, flags=re.IGNORECASE)
+        # Capitalize speaker tags, adding line breaks before "Speaker N:" tags
+        def _speaker(m):
+            tag = f'Speaker {m.group(1)}'
+            if m.group(2) and m.group(0).startswith('Speaker'):
+                return f'\n\n{tag}{m.group(2)}'
+            return tag + (m.group(2) or '')
+        text = RE_SPEAKER.sub(_speaker, text)
         # Fix common financial terms
-        financial_fixes = {
-            r'\bebitda\b': 'EBITDA', r'\broe\b': 'ROE', r'\broa\b': 'ROA',
-            r'\broce\b': 'ROCE', r'\bcagr\b': 'CAGR', r'\bpat\b': 'PAT',
-            r'\bpbt\b': 'PBT', r'\beps\b': 'EPS', r'\bnav\b': 'NAV',
-            r'\baum\b': 'AUM', r'\bnpa\b': 'NPA', r'\byoy\b': 'YoY',
-            r'\bqoq\b': 'QoQ', r'\bcapex\b': 'Capex', r'\bopex\b': 'Opex',
-        }
-        for pattern, replacement in financial_fixes.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-            
-        # Aggressive Scrubber for Hallucinations
-        # Pattern 1: Any variation of the system prompt injected into text
-        scrub_patterns = [
-            r"Lakh,\s*Crore,\s*EBITDA,\s*YoY,\s*QoQ,\s*PAT,\s*Margins,\s*Revenue\.?",
-            r"Hello,\s*welcome!\s*This\s*is\s*a\s*highly\s*accurate.*?financial\s*presentation\.?",
-            r"\[ID:\s*\d+\]\s*{time:\s*\[\d+:\d+:\d+\]}", # Residual tags if any leaked
-        ]
-        for p in scrub_patterns:
-            text = re.sub(p, "", text, flags=re.IGNORECASE)
+        text = RE_FINANCIAL_TERMS.sub(canonical_financial_term, text)
+        text = RE_HALLUCINATIONS.sub("", text)
             
         if context_keywords:
             # Only remove the actual context string if it's found as a standalone block (rare)
             pass
         
-        # Cleanup residual double-spacing and empty lines
-        text = re.sub(r' +', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
+        # Cleanup residual double-spacing and empty lines (also collapses runs of 3+ newlines)
+        text = RE_WHITESPACE_RUNS.sub(lambda m: ' ' if m.group(1) else '\n\n', text)
         
         # Final pass: remove any double timestamps or empty speaker headers
-        text = re.sub(r'\[SPEAKER\]\s+Unknown Speaker\s+\[TIME\]\s+\[\d+:\d+\]\s*\n*\s*$', '', text)
+        text = RE_TRAILING_EMPTY_SPEAKER.sub('', text)
         return text.strip()
 
     async def transcribe_full(self, audio_path: Path, job_id: str, company_name: str = "Meeting") -> dict:
@@ -1072,8 +1934,8 @@ class TranscriptionEngine:
         # Split audio with strict job isolation
         await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": "✂️ Splitting audio into chunks..."})
         
-        loop = asyncio.get_event_loop()
-        chunks = await loop.run_in_executor(None, self.split_audio, audio_path, chunk_minutes, job_id)
+        loop = self._main_loop = asyncio.get_running_loop()
+        chunks = await self.split_audio(audio_path, chunk_minutes, job_id)
         total_chunks = len(chunks)
         
         if total_chunks == 0:
@@ -1089,13 +1951,38 @@ class TranscriptionEngine:
         # Parallel transcription
         results = [None] * total_chunks
         completed_count = 0
+        
+        # Read-ahead: while chunk i uploads, chunk i+1 is already being pulled off disk
+        chunk_reads = {}
+        reads_started = set()
+        reads_lock = threading.Lock()
+
+        def chunk_bytes(idx):
+            with reads_lock:
+                for i in (idx, idx + 1):
+                    if i < total_chunks and i not in reads_started:
+                        reads_started.add(i)
+                        chunk_reads[i] = self._read_pool.submit(chunks[i].read_bytes)
+                future = chunk_reads.pop(idx)
+            try:
+                return future.result()
+            except OSError:
+                return None  # transcribe_chunk retries the read and reports the error
+
+        # Chunk index -> speaker talking at its end, for single-speaker chunks that skip the LLM;
+        # each chunk's event is set once its entry is final, so carried labels never depend on finish order
+        last_speakers: Dict[int, str] = {}
+        speaker_resolved = [asyncio.Event() for _ in chunks]
+        diarizer = DiarizationBatcher(
+            lambda batch: self.smart_format_batch_sync(batch, job_id, company_name, llama_context, all_keys)
+        )
 
         def process_chunk(idx, chunk_path):
             if job_id in self.cancelled_jobs:
-                return idx, {"text": "[CANCELLED]", "error": True}
+                return idx, {"text": "[CANCELLED]", "error": True}, None, None
                 
             # PASS WHISPER ONLY TECHNICAL JARGON (fixes hallucination of names)
-            result = self.transcribe_chunk(chunk_path, job_id, all_keys, model, whisper_keywords)
+            result = self.transcribe_chunk(chunk_path, job_id, all_keys, model, whisper_keywords, chunk_bytes(idx))
             
             # SMART TIMESTAMP CALCULATION & DIARIZATION INJECTION
             chunk_offset_seconds = idx * chunk_minutes * 60
@@ -1113,56 +2000,100 @@ class TranscriptionEngine:
                         segments_data.append({
                             "id": s_idx,
                             "time_str": time_str,
-                            "text": segment["text"].strip()
+                            "text": segment["text"].strip(),
+                            "start": segment["start"],
+                            "end": segment.get("end", segment["start"])
                         })
             
-            # SMART DIARIZATION PASS (PASS FULL CONTEXT/EXECUTIVES HERE)
+            # SMART DIARIZATION PASS (PASS FULL CONTEXT/EXECUTIVES HERE), batched with neighbouring short chunks.
+            # Handed to its own pool so this Whisper worker can start the next chunk right away.
+            format_future = None
+            monologue = None
             if segments_data and not result.get("error"):
-                formatted_text = self.smart_format_chunk_sync(segments_data, job_id, company_name, llama_context, all_keys)
-                result["text"] = formatted_text
+                if len(segments_data) <= SINGLE_SPEAKER_MAX_SEGMENTS:
+                    # Too short for turn-taking: skip the LLM; run_chunk labels it once the previous chunk is done
+                    monologue = segments_data
+                else:
+                    format_future = self._format_pool.submit(diarizer.format, idx, segments_data)
             elif result.get("text") and not result.get("error"):
                 # Safety fallback
                 pass
                 
-            return idx, result
+            return idx, result, format_future, monologue
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            tasks = [
-                loop.run_in_executor(executor, process_chunk, i, chunk)
-                for i, chunk in enumerate(chunks)
-            ]
-            
-            for coro in asyncio.as_completed(tasks):
-                idx, result = await coro
-                if job_id in self.cancelled_jobs:
+        # This job's share of the shared Whisper pool
+        whisper_slots = asyncio.Semaphore(max_workers)
+
+        async def run_chunk(idx, chunk_path):
+            try:
+                async with whisper_slots:
+                    idx, result, format_future, monologue = await loop.run_in_executor(self._http_pool, process_chunk, idx, chunk_path)
+                if format_future is not None:
+                    result["text"] = await asyncio.wrap_future(format_future)
+                    speaker_at = result["text"].rfind("[SPEAKER] ")
+                    if speaker_at != -1:
+                        last_speakers[idx] = result["text"][speaker_at + 10:].split("\n", 1)[0].strip()
+                elif monologue:
+                    # Carry the speaker talking at the end of the previous chunk, once that chunk is done
+                    if idx > 0:
+                        await speaker_resolved[idx - 1].wait()
+                    speaker = last_speakers.get(idx - 1, "Unknown Speaker")
+                    result["text"] = self._assemble_dialogue(monologue, {monologue[0]["id"]: speaker})
+                    last_speakers[idx] = speaker
+                return idx, result
+            finally:
+                speaker_resolved[idx].set()
+
+        tasks = [asyncio.ensure_future(run_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+        
+        # Race the chunks against the job's cancel event, so a cancel lands without waiting for a chunk to finish
+        cancel_event = self.cancel_events.setdefault(job_id, asyncio.Event())
+        if job_id in self.cancelled_jobs:
+            cancel_event.set()
+        cancel_wait = asyncio.ensure_future(cancel_event.wait())
+        pending = set(tasks)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending | {cancel_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if cancel_event.is_set():
+                    # Drop chunks still queued for a slot; in-flight ones bail out on the cancel flag
+                    for task in tasks:
+                        task.cancel()
                     await ws_manager.broadcast({"type": "error", "job_id": job_id, "message": "🛑 Job cancelled by user."})
                     return {"error": "Cancelled"}
                     
-                results[idx] = result
-                completed_count += 1
-                progress = int(5 + (completed_count / total_chunks) * 85)
-                await ws_manager.broadcast({
-                    "type": "progress", "job_id": job_id,
-                    "progress": progress,
-                    "message": f"🔄 Processed chunk {completed_count}/{total_chunks}..."
-                })
+                for task in done:
+                    pending.discard(task)
+                    idx, result = task.result()
+                    results[idx] = result
+                    completed_count += 1
+                    progress = int(5 + (completed_count / total_chunks) * 85)
+                    ws_manager.publish_progress({
+                        "type": "progress", "job_id": job_id,
+                        "progress": progress,
+                        "message": f"🔄 Processed chunk {completed_count}/{total_chunks}..."
+                    })
+        finally:
+            cancel_wait.cancel()
+            self.cancel_events.pop(job_id, None)
 
         # Combine results
         await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": "📝 Combining and formatting transcript..."})
         
-        full_text = ""
+        text_parts = []
         errors = []
         for i, result in enumerate(results):
             if result and not result.get("error"):
                 text = result.get("text", "")
-                full_text += f"\n\n{text}"
+                text_parts.append(f"\n\n{text}")
             else:
                 err_txt = result.get('text', 'Unknown error') if result else 'Unknown error'
                 errors.append(f"Chunk {i+1}: {err_txt}")
-                full_text += f"\n\n[WARNING: A section failed to transcribe. Error: {err_txt}]"
+                text_parts.append(f"\n\n[WARNING: A section failed to transcribe. Error: {err_txt}]")
+        full_text = "".join(text_parts)
 
-        # Post-process
-        full_text = self.post_process_transcript(full_text, llama_context)
+        # Post-process (regex passes over the whole transcript; keep them off the event loop)
+        full_text = await loop.run_in_executor(self._post_pool, self.post_process_transcript, full_text, llama_context)
         
         valid_chunk_count = sum(1 for r in results if r and not r.get("error"))
         await ws_manager.broadcast({
@@ -1176,25 +2107,19 @@ class TranscriptionEngine:
         await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": "📄 Generating files & building master bundle..."})
         
         timestamp = datetime.now().strftime("%Y-%m-%d_%H%M")
-        safe_name = re.sub(r'[^\w\s-]', '', company_name).strip().replace(' ', '_')
+        safe_name = RE_UNSAFE_FILENAME_CHARS.sub('', company_name).strip().replace(' ', '_')
         file_prefix = f"{safe_name}_{timestamp}"
         
-        # Save TXT (Format naturally)
-        clean_txt = full_text.replace('[SPEAKER]', '').replace('[TIME]', '')
         txt_path = OUTPUT_DIR / f"{file_prefix}.txt"
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(f"{company_name} - TRANSCRIPT\n")
-            f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
-            f.write("=" * 60 + "\n\n")
-            f.write(clean_txt)
-
-        # Save PDF
         pdf_path = OUTPUT_DIR / f"{file_prefix}.pdf"
-        self._generate_pdf(pdf_path, company_name, full_text, processing_time)
-
-        # Compress MP3 to output
         compressed_path = MP3_DIR / f"{file_prefix}.mp3"
-        await self._compress_mp3(audio_path, compressed_path)
+        
+        # TXT, PDF and the MP3 copy are independent: produce them concurrently
+        await asyncio.gather(
+            loop.run_in_executor(self._post_pool, self._write_txt, txt_path, company_name, full_text),
+            loop.run_in_executor(self._post_pool, self._generate_pdf, pdf_path, company_name, full_text, processing_time),
+            self._compress_mp3(audio_path, compressed_path),
+        )
 
         # Save Keywords
         keywords_path = None
@@ -1205,41 +2130,17 @@ class TranscriptionEngine:
                 f.write("="*40 + "\n")
                 f.write(keywords + "\n")
                 
-        # Master Folder
+        # Master Folder + zip, once every artifact above exists
         bundle_dir = TEMP_DIR / file_prefix
-        bundle_dir.mkdir(exist_ok=True)
-        import shutil
-        shutil.copy(txt_path, bundle_dir)
-        shutil.copy(pdf_path, bundle_dir)
-        shutil.copy(compressed_path, bundle_dir)
-        if keywords_path:
-            shutil.copy(keywords_path, bundle_dir)
-            
-        is_cloud = os.environ.get("RENDER") == "true" or os.environ.get("SPACE_ID") is not None
-        if not is_cloud and Path.home().exists():
-            mac_downloads = Path.home() / "Downloads" / "Transcriptor_Outputs"
-            mac_downloads.mkdir(parents=True, exist_ok=True)
-            mac_bundle = mac_downloads / file_prefix
-            if mac_bundle.exists():
-                shutil.rmtree(mac_bundle)
-            shutil.copytree(bundle_dir, mac_bundle)
+        artifacts = [txt_path, pdf_path, compressed_path] + ([keywords_path] if keywords_path else [])
+        saved_locally = await loop.run_in_executor(self._post_pool, self._build_bundle, bundle_dir, artifacts, file_prefix)
+        if saved_locally:
             await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": f"📁 Master folder saved locally to Downloads/Transcriptor_Outputs/{file_prefix}"})
-
-        # Create zip in output dir
-        shutil.make_archive(str(OUTPUT_DIR / file_prefix), 'zip', str(bundle_dir))
         
         await ws_manager.broadcast({"type": "progress", "job_id": job_id, "progress": 100})
         
         # Clean up temp chunks and bundle
-        try:
-            shutil.rmtree(bundle_dir)
-        except Exception:
-            pass
-        for chunk in chunks:
-            try:
-                chunk.unlink()
-            except Exception:
-                pass
+        await loop.run_in_executor(self._post_pool, self._cleanup_job_files, bundle_dir, chunks)
         
         result_data = {
             "job_id": job_id,
@@ -1265,6 +2166,60 @@ class TranscriptionEngine:
 
         return result_data
 
+    @staticmethod
+    def _cleanup_job_files(bundle_dir: Path, chunks: List[Path]):
+        """Remove the bundle folder and chunk files once the job's outputs are saved."""
+        try:
+            shutil.rmtree(bundle_dir)
+        except Exception:
+            pass
+        for chunk in chunks:
+            try:
+                chunk.unlink()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _write_txt(txt_path: Path, company_name: str, full_text: str):
+        """Save TXT (Format naturally)."""
+        clean_txt = full_text.replace('[SPEAKER]', '').replace('[TIME]', '')
+        # One encode + one write syscall instead of several buffered writes
+        body = (
+            f"{company_name} - TRANSCRIPT\n"
+            f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+            f"{'=' * 60}\n\n"
+            f"{clean_txt}"
+        )
+        txt_path.write_bytes(body.encode('utf-8'))
+
+    @staticmethod
+    def _build_bundle(bundle_dir: Path, artifacts: List[Path], file_prefix: str) -> bool:
+        """Gather artifacts into the master folder, mirror it to Downloads locally, and zip it. True if mirrored."""
+        bundle_dir.mkdir(exist_ok=True)
+        for artifact in artifacts:
+            # copyfile: data only (sendfile fast path on Linux), no chmod/stat metadata pass
+            shutil.copyfile(artifact, bundle_dir / artifact.name)
+            
+        saved_locally = False
+        is_cloud = os.environ.get("RENDER") == "true" or os.environ.get("SPACE_ID") is not None
+        if not is_cloud and Path.home().exists():
+            mac_downloads = Path.home() / "Downloads" / "Transcriptor_Outputs"
+            ensure_dir(mac_downloads)
+            mac_bundle = mac_downloads / file_prefix
+            if mac_bundle.exists():
+                shutil.rmtree(mac_bundle)
+            shutil.copytree(bundle_dir, mac_bundle)
+            saved_locally = True
+
+        # Create zip in output dir: audio is already compressed, so store it; text gets a fast deflate
+        with zipfile.ZipFile(OUTPUT_DIR / f"{file_prefix}.zip", "w", allowZip64=True) as z:
+            for p in sorted(bundle_dir.iterdir()):
+                if p.suffix.lower() in PRECOMPRESSED_SUFFIXES:
+                    z.write(p, arcname=p.name, compress_type=zipfile.ZIP_STORED)
+                else:
+                    z.write(p, arcname=p.name, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        return saved_locally
+
     def _generate_pdf(self, output_path: Path, company_name: str, text: str, processing_time: float):
         """Generate a professional PDF transcript."""
         from fpdf import FPDF
@@ -1288,35 +2243,46 @@ class TranscriptionEngine:
         pdf.add_page()
         pdf.set_font('Helvetica', '', 10)
 
-        def _safe_write(pdf_obj, text_line):
-            safe_text = text_line.encode('latin-1', 'replace').decode('latin-1')
-            try:
-                pdf_obj.multi_cell(0, 5, safe_text)
-            except Exception as e:
-                # Fallback for FPDFException "Not enough horizontal space" caused by huge unbroken words
-                chunks = [safe_text[i:i+90] for i in range(0, len(safe_text), 90)]
-                for chunk in chunks:
-                    try:
-                        pdf_obj.multi_cell(0, 5, chunk)
-                    except:
-                        pass
+        def _fit_words(text_line):
+            # Pre-split huge unbroken words (URLs, glued tokens) so multi_cell never raises
+            # "Not enough horizontal space"; ordinary lines still wrap at the page width
+            if len(text_line) > PDF_MAX_WORD_CHARS and any(len(w) > PDF_MAX_WORD_CHARS for w in text_line.split(' ')):
+                text_line = ' '.join(
+                    ' '.join(w[i:i + PDF_MAX_WORD_CHARS] for i in range(0, len(w), PDF_MAX_WORD_CHARS))
+                    for w in text_line.split(' ')
+                )
+            return text_line
+
+        # Consecutive plain lines share one multi_cell call; '\n' breaks lay out exactly like separate calls
+        body = []
 
+        def _flush_body():
+            if body:
+                pdf.multi_cell(0, 5, '\n'.join(body))
+                body.clear()
+
+        # Core fonts are latin-1 only: coerce the whole transcript once instead of line by line
+        text = text.encode('latin-1', 'replace').decode('latin-1')
         for line in text.split('\n'):
             line = line.strip()
             if not line:
+                _flush_body()
                 pdf.ln(3)
                 continue
                 
-            clean_line = line.replace('**', '')
+            # Most lines carry no markdown bold, so skip the copy
+            clean_line = line.replace('**', '') if '**' in line else line
 
             if clean_line.startswith('[SPEAKER]'):
-                speaker_name = clean_line.replace('[SPEAKER]', '').strip()
+                _flush_body()
+                speaker_name = clean_line[len('[SPEAKER]'):].strip()
                 pdf.ln(5)
                 pdf.set_font('Helvetica', 'B', 10)
                 pdf.set_text_color(0, 0, 0)
                 pdf.cell(0, 5, speaker_name, ln=True)
             elif clean_line.startswith('[TIME]'):
-                time_str = clean_line.replace('[TIME]', '').strip()
+                _flush_body()
+                time_str = clean_line[len('[TIME]'):].strip()
                 pdf.set_font('Helvetica', 'I', 8)
                 pdf.set_text_color(120, 120, 120)  # Professional grey timestamp
                 pdf.cell(0, 4, time_str, ln=True)
@@ -1325,46 +2291,182 @@ class TranscriptionEngine:
             elif clean_line.startswith('[TITLE]'):
                 pass # Deprecated gracefully
             elif clean_line.startswith('---'):
+                _flush_body()
                 pdf.set_font('Helvetica', 'I', 9)
                 pdf.cell(0, 5, clean_line, ln=True)
                 pdf.set_font('Helvetica', '', 10)
-            elif re.match(r'^[A-Z][\w\s\.\-]{0,40}:', clean_line) or re.match(r'Speaker\s*\d+\s*:', clean_line, flags=re.IGNORECASE):
+            elif RE_PDF_SPEAKER_LINE.match(clean_line):
                 # Fallback if AI misses the new tag
+                _flush_body()
                 pdf.ln(4)
                 pdf.set_font('Helvetica', 'B', 10)
-                _safe_write(pdf, clean_line)
+                pdf.multi_cell(0, 5, _fit_words(clean_line))
                 pdf.set_font('Helvetica', '', 10)
             else:
-                _safe_write(pdf, clean_line)
+                body.append(_fit_words(clean_line))
+        _flush_body()
 
         try:
             pdf.output(str(output_path))
         except BaseException as e:
             logger.error(f"Failed to save PDF: {str(e)}")
 
+    @staticmethod
+    def _link_or_copy(src: Path, dst: Path):
+        """Hardlink dst to src (no data copied); fall back to a copy across filesystems."""
+        try:
+            dst.unlink(missing_ok=True)
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
     async def _compress_mp3(self, input_path: Path, output_path: Path, bitrate: str = "128k"):
-        """Compress or copy MP3 to specified path."""
+        """Compress MP3 to specified path; an MP3 already near the target bitrate is linked, not re-encoded."""
         try:
-            if input_path.suffix.lower() == '.mp3':
-                import shutil
-                shutil.copy2(str(input_path), str(output_path))
+            codec, bit_rate = await self._probe_audio_stream(input_path)
+            # Without ffprobe, trust the extension as before
+            unprobed_mp3 = codec is None and input_path.suffix.lower() == '.mp3'
+            if unprobed_mp3 or self._mp3_matches_bitrate(codec, bit_rate, bitrate):
+                await asyncio.get_running_loop().run_in_executor(self._post_pool, self._link_or_copy, input_path, output_path)
                 return
 
-            ffmpeg = FFMPEG_PATH or "ffmpeg"
-            cmd = [ffmpeg, "-i", str(input_path), "-codec:a", "libmp3lame", "-b:a", bitrate, "-y", str(output_path)]
-            process = await asyncio.create_subprocess_exec(
-                *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
-            )
-            await process.communicate()
+            async with self._ffmpeg_slots:
+                encoded = await self._run_ffmpeg("-i", str(input_path), "-codec:a", "libmp3lame", "-b:a", bitrate, "-y", str(output_path))
+            if not encoded:
+                raise RuntimeError(f"ffmpeg could not encode {input_path.name}")
         except Exception as e:
             logger.error(f"MP3 compression error: {e}")
-            import shutil
-            shutil.copy2(str(input_path), str(output_path))
+            await asyncio.get_running_loop().run_in_executor(self._post_pool, shutil.copy2, str(input_path), str(output_path))
+
+    async def _run_ffmpeg(self, *args: str) -> bool:
+        """Run ffmpeg with the shared quiet prefix; True on a zero exit."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *FFMPEG_BASE, *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            return await proc.wait() == 0
+        except OSError as e:
+            logger.error(f"FFmpeg launch failed: {e}")
+            return False
+
+    async def _probe_duration(self, audio_path: Path) -> float:
+        """Container duration in seconds via ffprobe (0.0 if unknown)."""
+        if not FFPROBE_PATH:
+            return 0.0
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1",
+                str(audio_path), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await proc.communicate()
+            return float(stdout.strip() or 0)
+        except (OSError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _mp3_matches_bitrate(codec: Optional[str], bit_rate: int, bitrate: str) -> bool:
+        """True if a probed stream is MP3 within MP3_BITRATE_TOLERANCE of bitrate (e.g. "128k")."""
+        try:
+            target = int(float(bitrate.lower().rstrip("k")) * 1000)
+        except ValueError:
+            return False
+        return codec == "mp3" and target > 0 and abs(bit_rate - target) <= target * MP3_BITRATE_TOLERANCE
+
+    async def convert_to_mp3(self, input_path: Path, output_path: Path, bitrate: str = "128k") -> bool:
+        """Produce an MP3 at the requested bitrate, consuming input_path. An MP3 already near that bitrate is moved, not re-encoded."""
+        if self._mp3_matches_bitrate(*await self._probe_audio_stream(input_path), bitrate):
+            await asyncio.to_thread(shutil.move, str(input_path), str(output_path))
+            return True
+        async with self._ffmpeg_slots:
+            return await self._run_ffmpeg("-i", str(input_path), "-vn", "-codec:a", "libmp3lame", "-b:a", bitrate, "-y", str(output_path))
+
+    async def _probe_stream_layout(self, audio_path: Path) -> Optional[tuple]:
+        """(codec_name, sample_rate, channels) of the first audio stream, or None if it can't be probed."""
+        if not FFPROBE_PATH:
+            return None
+        cmd = [
+            FFPROBE_PATH, "-v", "error", "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name,sample_rate,channels", "-of", "default=noprint_wrappers=1",
+            str(audio_path)
+        ]
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+            stdout, _ = await proc.communicate()
+            if proc.returncode != 0:
+                return None
+            fields = dict(line.partition("=")[::2] for line in stdout.decode(errors='replace').splitlines())
+            if not fields.get("codec_name"):
+                return None
+            return fields["codec_name"], fields.get("sample_rate"), fields.get("channels")
+        except OSError:
+            return None
+
+    async def merge_audio(self, inputs: List[Path], output_path: Path) -> bool:
+        """Join files with ffmpeg: MP3s with identical stream parameters are frame-copied, anything else re-encoded once."""
+        layouts = await asyncio.gather(*(self._probe_stream_layout(p) for p in inputs))
+        # The concat demuxer assumes every input matches the first; it only fits identical MP3 streams
+        if layouts[0] is not None and layouts[0][0] == "mp3" and all(l == layouts[0] for l in layouts):
+            list_path = output_path.with_suffix(".concat.txt")
+            # Concat list syntax: single-quoted paths, with ' written as '\''
+            list_path.write_text("".join(
+                "file '{}'\n".format(str(p.resolve()).replace("'", "'\\''")) for p in inputs
+            ), encoding='utf-8')
+            try:
+                async with self._ffmpeg_slots:
+                    return await self._run_ffmpeg("-f", "concat", "-safe", "0", "-i", str(list_path), "-vn", "-c", "copy", "-y", str(output_path))
+            finally:
+                list_path.unlink(missing_ok=True)
+
+        # The concat filter decodes each input and negotiates a common sample rate and channel layout
+        input_args = [arg for p in inputs for arg in ("-i", str(p))]
+        graph = "".join(f"[{i}:a]" for i in range(len(inputs))) + f"concat=n={len(inputs)}:v=0:a=1[a]"
+        async with self._ffmpeg_slots:
+            return await self._run_ffmpeg(
+                *input_args, "-filter_complex", graph, "-map", "[a]",
+                "-c:a", "libmp3lame", "-b:a", "128k", "-y", str(output_path)
+            )
+
+    @staticmethod
+    def _pydub_merge(inputs: List[Path], output_path: Path) -> float:
+        """Decode/re-encode merge for inputs ffmpeg's concat demuxer rejects. Returns the duration in seconds."""
+        from pydub import AudioSegment
+        combined = AudioSegment.empty()
+        for path in inputs:
+            combined += AudioSegment.from_file(str(path))
+        combined.export(str(output_path), format="mp3", bitrate="128k")
+        return len(combined) / 1000
+
+    @staticmethod
+    def _pydub_split(input_path: Path, segment_minutes: int, job_id: str) -> List[str]:
+        """Decode/re-encode split, for when ffmpeg's segment muxer fails."""
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(str(input_path))
+        chunk_ms = segment_minutes * 60 * 1000
+        outputs = []
+        for i in range(0, len(audio), chunk_ms):
+            chunk = audio[i:i + chunk_ms]
+            chunk_path = MP3_DIR / f"split_{job_id}_part{(i // chunk_ms) + 1:03d}.mp3"
+            chunk.export(str(chunk_path), format="mp3", bitrate="128k")
+            outputs.append(str(chunk_path))
+        return outputs
+
+    async def segment_audio(self, input_path: Path, segment_seconds: int, output_pattern: str) -> bool:
+        """Cut a file into fixed-length MP3 parts with ffmpeg's segment muxer, numbered from 1."""
+        if input_path.suffix.lower() == ".mp3":
+            codec_args = ["-c", "copy"]
+        else:
+            codec_args = ["-c:a", "libmp3lame", "-b:a", "128k"]
+        async with self._ffmpeg_slots:
+            return await self._run_ffmpeg(
+                "-i", str(input_path), "-vn", "-f", "segment", "-segment_time", str(segment_seconds),
+                "-segment_start_number", "1", "-reset_timestamps", "1", *codec_args, output_pattern
+            )
 
 engine = TranscriptionEngine()
 
 # ─── FastAPI Application ─────────────────────────────────────────────────────
-app = FastAPI(title="AI Transcriptor", version="2.0.0")
+# orjson renders API responses several times faster than the stdlib encoder when it's installed
+app = FastAPI(title="AI Transcriptor", version="2.0.0", default_response_class=ORJSONResponse if orjson is not None else JSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1377,24 +2479,82 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
+@app.on_event("startup")
+async def start_log_pump():
+    app.state.log_pump = asyncio.create_task(ws_manager.pump())
+
+@app.on_event("startup")
+async def configure_default_executor():
+    # run_in_executor(None, ...) shares this pool; size it for network-bound work, not CPU count
+    workers = max(32, int(settings_manager.settings.get("max_parallel_workers", 20)) * 2)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aitx")
+    )
+
+@app.on_event("startup")
+async def start_writers():
+    for writer in (settings_manager.writer, history_manager.writer, schedule_manager.writer, engine.keyword_writer):
+        writer.start()
+
+@app.on_event("startup")
+async def prune_caches():
+    await asyncio.to_thread(engine.prune_diarization_cache)
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    await close_proxy_client()
+    await close_groq_async_client()
+    close_groq_client()
+
+@app.on_event("shutdown")
+async def flush_writers():
+    for writer in (settings_manager.writer, history_manager.writer, schedule_manager.writer, engine.keyword_writer):
+        await writer.stop()
+
+def _copy_upload(src, path: Path) -> int:
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(src, f, UPLOAD_COPY_CHUNK)
+        return f.tell()
+
+async def save_upload(file: UploadFile, path: Path) -> int:
+    """Stream an uploaded file to disk on a worker thread. Returns the bytes written."""
+    await file.seek(0)
+    return await asyncio.to_thread(_copy_upload, file.file, path)
+
+@asynccontextmanager
+async def staged_uploads(job_id: str, uploads: List[UploadFile]):
+    """Stream uploads into TEMP_DIR for the duration of the block; the copies are removed on exit, errors included."""
+    paths = []
+    try:
+        for i, upload in enumerate(uploads):
+            path = TEMP_DIR / f"{job_id}_{i}_{upload.filename}"
+            paths.append(path)
+            await save_upload(upload, path)
+        yield paths
+    finally:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
 # ─── Routes ──────────────────────────────────────────────────────────────────
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+PONG_FRAME = '{"type":"pong"}'
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await ws_manager.connect(websocket)
     try:
         while True:
             data = await websocket.receive_text()
-            msg = json.loads(data)
+            msg = loads_json(data)
             if msg.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                await websocket.send_text(PONG_FRAME)
             elif msg.get("type") == "cancel":
                 job_id = msg.get("job_id")
                 if job_id:
-                    engine.cancelled_jobs.add(job_id)
+                    engine.cancel_job(job_id)
                     await ws_manager.broadcast({"type": "log", "job_id": job_id, "message": "🛑 Force Stop signal received."})
     except WebSocketDisconnect:
         ws_manager.disconnect(websocket)
@@ -1437,9 +2597,7 @@ async def transcribe_upload(
     
     # Save uploaded file
     file_path = TEMP_DIR / f"{job_id}_{file.filename}"
-    with open(file_path, 'wb') as f:
-        content = await file.read()
-        f.write(content)
+    await save_upload(file, file_path)
     
     async def run_job():
         try:
@@ -1463,19 +2621,13 @@ async def compress_mp3(
     bitrate: str = Form("128k")
 ):
     job_id = str(uuid.uuid4())[:8]
-    input_path = TEMP_DIR / f"{job_id}_{file.filename}"
-    
-    with open(input_path, 'wb') as f:
-        content = await file.read()
-        f.write(content)
-    
     output_path = MP3_DIR / f"compressed_{job_id}_{file.filename}"
-    await engine._compress_mp3(input_path, output_path, bitrate)
     
-    input_path.unlink(missing_ok=True)
+    async with staged_uploads(job_id, [file]) as (input_path,):
+        original_size = input_path.stat().st_size
+        await engine._compress_mp3(input_path, output_path, bitrate)
     
     # Get file sizes
-    original_size = len(content)
     compressed_size = output_path.stat().st_size if output_path.exists() else 0
     
     return {
@@ -1488,26 +2640,21 @@ async def compress_mp3(
 
 @app.post("/api/mp3/merge")
 async def merge_mp3(files: List[UploadFile] = File(...)):
-    from pydub import AudioSegment
-    
     job_id = str(uuid.uuid4())[:8]
-    combined = AudioSegment.empty()
-    
-    for file in files:
-        temp_path = TEMP_DIR / f"{job_id}_{file.filename}"
-        with open(temp_path, 'wb') as f:
-            f.write(await file.read())
-        audio = AudioSegment.from_file(str(temp_path))
-        combined += audio
-        temp_path.unlink(missing_ok=True)
-    
     output_path = MP3_DIR / f"merged_{job_id}.mp3"
-    combined.export(str(output_path), format="mp3", bitrate="128k")
+    
+    async with staged_uploads(job_id, files) as temp_paths:
+        if await engine.merge_audio(temp_paths, output_path):
+            duration = await engine._probe_duration(output_path)
+        else:
+            # ffmpeg couldn't join them (e.g. an input with no audio stream): decode and re-encode via pydub
+            logger.warning(f"FFmpeg concat failed for merge {job_id}; falling back to pydub")
+            duration = await asyncio.get_running_loop().run_in_executor(engine._post_pool, engine._pydub_merge, temp_paths, output_path)
     
     return {
         "status": "success",
         "output_path": str(output_path),
-        "duration_seconds": round(len(combined) / 1000, 1)
+        "duration_seconds": round(duration, 1)
     }
 
 @app.post("/api/mp3/split")
@@ -1515,24 +2662,14 @@ async def split_mp3(
     file: UploadFile = File(...),
     segment_minutes: int = Form(10)
 ):
-    from pydub import AudioSegment
-    
     job_id = str(uuid.uuid4())[:8]
-    input_path = TEMP_DIR / f"{job_id}_{file.filename}"
-    with open(input_path, 'wb') as f:
-        f.write(await file.read())
-    
-    audio = AudioSegment.from_file(str(input_path))
-    chunk_ms = segment_minutes * 60 * 1000
-    outputs = []
     
-    for i in range(0, len(audio), chunk_ms):
-        chunk = audio[i:i + chunk_ms]
-        chunk_path = MP3_DIR / f"split_{job_id}_part{(i // chunk_ms) + 1:03d}.mp3"
-        chunk.export(str(chunk_path), format="mp3", bitrate="128k")
-        outputs.append(str(chunk_path))
-    
-    input_path.unlink(missing_ok=True)
+    async with staged_uploads(job_id, [file]) as (input_path,):
+        if await engine.segment_audio(input_path, segment_minutes * 60, str(MP3_DIR / f"split_{job_id}_part%03d.mp3")):
+            outputs = [str(p) for p in sorted(MP3_DIR.glob(f"split_{job_id}_part*.mp3"))]
+        else:
+            logger.warning(f"FFmpeg segment failed for split {job_id}; falling back to pydub")
+            outputs = await asyncio.get_running_loop().run_in_executor(engine._post_pool, engine._pydub_split, input_path, segment_minutes, job_id)
     
     return {
         "status": "success",
@@ -1546,19 +2683,10 @@ async def convert_to_mp3(
     bitrate: str = Form("128k")
 ):
     job_id = str(uuid.uuid4())[:8]
-    input_path = TEMP_DIR / f"{job_id}_{file.filename}"
-    with open(input_path, 'wb') as f:
-        f.write(await file.read())
-    
     output_path = MP3_DIR / f"converted_{job_id}.mp3"
-    ffmpeg = FFMPEG_PATH or "ffmpeg"
     
-    process = await asyncio.create_subprocess_exec(
-        ffmpeg, "-i", str(input_path), "-codec:a", "libmp3lame", "-b:a", bitrate, "-y", str(output_path),
-        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    await process.communicate()
-    input_path.unlink(missing_ok=True)
+    async with staged_uploads(job_id, [file]) as (input_path,):
+        await engine.convert_to_mp3(input_path, output_path, bitrate)
     
     return {
         "status": "success",
@@ -1580,18 +2708,8 @@ async def mp3_from_link(
         
     # 2. Compress to desired bitrate
     output_path = MP3_DIR / f"downloaded_{job_id}.mp3"
-    ffmpeg = FFMPEG_PATH or "ffmpeg"
-    
-    process = await asyncio.create_subprocess_exec(
-        ffmpeg, "-i", str(audio_path), "-codec:a", "libmp3lame", "-b:a", bitrate, "-y", str(output_path),
-        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    await process.communicate()
-    
-    try:
-        audio_path.unlink()
-    except Exception:
-        pass
+    await engine.convert_to_mp3(audio_path, output_path, bitrate)
+    audio_path.unlink(missing_ok=True)
         
     return {
         "status": "success",
@@ -1609,6 +2727,8 @@ async def get_settings():
 async def update_settings(request: Request):
     body = await request.json()
     settings_manager.update(body)
+    # Newly added keys should be picked up by chunks parked on exhausted ones
+    engine.wake_key_waiters()
     return {"status": "saved"}
 
 @app.post("/api/settings/test-key")
@@ -1618,14 +2738,11 @@ async def test_api_key(request: Request):
     if not key:
         raise HTTPException(status_code=400, detail="API key is required")
     
-    import httpx
     try:
-        verify = str(cert_path) if cert_path.exists() else True
-        response = httpx.get(
-            "https://api.groq.com/openai/v1/models",
+        response = await get_groq_async_client().get(
+            "/models",
             headers={"Authorization": f"Bearer {key}"},
-            timeout=15,
-            verify=verify
+            timeout=15
         )
         if response.status_code == 200:
             models = response.json().get("data", [])
@@ -1663,7 +2780,7 @@ async def remove_schedule(schedule_id: str):
 
 # ─── File Download Endpoints ─────────────────────────────────────────────────
 @app.get("/api/download/{file_type}/{filename}")
-async def download_file(file_type: str, filename: str):
+async def download_file(file_type: str, filename: str, request: Request):
     if file_type == "transcript":
         base = OUTPUT_DIR
     elif file_type == "mp3":
@@ -1672,10 +2789,19 @@ async def download_file(file_type: str, filename: str):
         raise HTTPException(status_code=400, detail="Invalid file type")
     
     file_path = base / filename
-    if not file_path.exists():
+    try:
+        stat = file_path.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(str(file_path), filename=filename)
+    # Outputs are never rewritten in place, so (mtime, size) identifies the content; repeat downloads get a bodiless 304
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    # Passing the stat saves Starlette a second stat() before it streams the file
+    return FileResponse(file_path, filename=filename, stat_result=stat, headers={"ETag": etag})
 
 # ─── System Info ──────────────────────────────────────────────────────────────
 @app.get("/api/system")
@@ -1685,14 +2811,14 @@ async def system_info():
         "platform": platform.system(),
         "python_version": platform.python_version(),
         "ffmpeg_available": FFMPEG_PATH is not None,
-        "ssl_cert_available": cert_path.exists(),
+        "ssl_cert_available": SSL_VERIFY is not True,
         "data_directory": str(APP_DATA_DIR),
         "output_directory": str(OUTPUT_DIR),
         "mp3_directory": str(MP3_DIR),
         "total_api_keys": len(keys),
         "paid_keys": len(settings_manager.settings.get("paid_api_keys", [])),
         "free_keys": len(settings_manager.settings.get("free_api_keys", [])),
-        "history_count": len(history_manager.get_all()),
+        "history_count": len(history_manager.history),
     }
 
 # ─── Feedback Endpoint ───────────────────────────────────────────────────────
@@ -1704,6 +2830,21 @@ async def submit_feedback(request: Request):
     return {"status": "received", "message": "Thank you for your feedback! It has been sent to shivamkole1234@gmail.com"}
 
 # ─── Startup ──────────────────────────────────────────────────────────────────
+def uvicorn_server_options() -> dict:
+    """Pin uvloop + httptools when installed (uvicorn[standard] ships both; uvloop has no Windows build)."""
+    options = {}
+    try:
+        import uvloop  # noqa: F401
+        options["loop"] = "uvloop"
+    except ImportError:
+        options["loop"] = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        options["http"] = "httptools"
+    except ImportError:
+        options["http"] = "h11"
+    return options
+
 def open_browser():
     """Open browser after a short delay."""
     import webbrowser
@@ -1716,11 +2857,12 @@ if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8765))
     host = "0.0.0.0" if is_cloud else "127.0.0.1"
 
+    server_options = uvicorn_server_options()
     logger.info("=" * 60)
+    logger.info(f"⚡ Event loop: {server_options['loop']}, HTTP parser: {server_options['http']}")
 
     # ─── Fresh State Initialization ───
     # Clear temp files on startup so it feels like a "new app" as requested
-    import shutil
     for d in [TEMP_DIR, MP3_DIR]:
         if d.exists():
             try:
@@ -1733,7 +2875,7 @@ if __name__ == "__main__":
 
     if is_cloud:
         # Cloud mode: just run uvicorn, no browser/pywebview
-        uvicorn.run(app, host=host, port=port, log_level="info")
+        uvicorn.run(app, host=host, port=port, log_level="info", **server_options)
     else:
         # Desktop mode: try pywebview first, fallback to browser
         try:
@@ -1742,7 +2884,7 @@ if __name__ == "__main__":
             # Start Uvicorn in background thread for Desktop mode
             server_thread = threading.Thread(
                 target=uvicorn.run, args=(app,),
-                kwargs={"host": host, "port": port, "log_level": "warning"},
+                kwargs={"host": host, "port": port, "log_level": "warning", **server_options},
                 daemon=True
             )
             server_thread.start()
@@ -1764,5 +2906,5 @@ if __name__ == "__main__":
         except ImportError:
             logger.info("pywebview not available, opening in browser...")
             threading.Thread(target=open_browser, daemon=True).start()
-            uvicorn.run(app, host=host, port=port, log_level="info")
+            uvicorn.run(app, host=host, port=port, log_level="info", **server_options)
 